@@ -1,11 +1,22 @@
 import logging
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
 import requests
 
 from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcCompression import CompressionConfig
+from exporter.rpcDebug import CycleTimings
+from exporter.rpcTransport import create_session, is_unix_url, normalize_url
+
+
+@lru_cache(maxsize=None)
+def _unix_socket_session() -> requests.Session:
+    """Session shared by calls to Unix socket URLs made without an explicit session."""
+    return create_session("http1")
 
 
 @dataclass
@@ -17,13 +28,15 @@ class JsonRPCRequest:
         self.params = params
         self.use_get: bool = use_get
 
-    def to_json(self) -> dict:
+    def to_json(self, request_id: int = 1) -> dict:
         """
         Convert the JsonRPCRequest instance to a dictionary suitable for JSON serialization.
+
+        :param request_id: JSON-RPC id of the request, used to match batched responses.
         """
         return {
             "jsonrpc": "2.0",
-            "id": 1,
+            "id": request_id,
             "method": self.method,
             "params": (
                 self.params if self.params is not None else []
@@ -62,18 +75,43 @@ class JsonRPCRequest:
         rpc_url: str,
         rpc_requests: Union["JsonRPCRequest", List["JsonRPCRequest"]],
         logger: Optional[logging.Logger] = None,
+        session: Optional[requests.Session] = None,
+        compression: Optional[CompressionConfig] = None,
+        timings: Optional[CycleTimings] = None,
     ) -> List["JsonRPCResponse"]:
         """
         Send a JSON-RPC request using either POST or GET.
 
-        :param rpc_url: Base URL for the RPC server.
+        :param rpc_url: Base URL for the RPC server, http(s)://, unix:// or http+unix://.
         :param rpc_requests: Single or list of JsonRPCRequest instances.
         :param logger: Logger instance for logging errors.
+        :param session: Optional session whose connection pool is reused across calls.
+        :param compression: Optional content-coding negotiation and body compression.
+        :param timings: Optional cycle timings receiving the rpc_wait, transfer and decode
+            phases.
         :return: List of JsonRPCResponse objects.
         """
         is_single: bool = isinstance(rpc_requests, JsonRPCRequest)
         requests_list: List[JsonRPCRequest] = [rpc_requests] if is_single else rpc_requests
         responses = []
+        rpc_url = normalize_url(rpc_url)
+        # A session from rpcTransport.create_session or the requests module itself
+        http: Any
+        if session is not None:
+            http = session
+        elif is_unix_url(rpc_url):
+            http = _unix_socket_session()
+        else:
+            http = requests
+
+        def timed(phase: str):
+            return timings.measure(phase) if timings else nullcontext()
+
+        def decode_json(response):
+            if compression:
+                return compression.decode_json(response, timings)
+            with timed("decode"):
+                return response.json()
 
         try:
             if any(req.use_get for req in requests_list):
@@ -83,12 +121,17 @@ class JsonRPCRequest:
                         constructed_url = JsonRPCRequest.construct_url(
                             rpc_url, req.method, req.params
                         )
-                        response = requests.get(constructed_url, timeout=15)
-                        if response.status_code == 200:
-                            responses.append(
-                                JsonRPCResponse(result=response.json(), error=None)
+                        with timed("rpc_wait"):
+                            response = http.get(
+                                constructed_url,
+                                timeout=15,
+                                **(compression.get_kwargs() if compression else {}),
                             )
+                        if response.status_code == 200:
+                            result = decode_json(response)
+                            responses.append(JsonRPCResponse(result=result, error=None))
                         else:
+                            response.close()
                             responses.append(
                                 JsonRPCResponse(
                                     result=None,
@@ -103,16 +146,23 @@ class JsonRPCRequest:
             else:
                 # Handle POST requests in batch mode
                 print(f"requests_list: {[req.params for req in requests_list]}")
-                batch_requests = [req.to_json() for req in requests_list]
+                batch_requests = [
+                    req.to_json(request_id=index) for index, req in enumerate(requests_list, 1)
+                ]
                 print(f"processed batched requests: {batch_requests}")
-                response: requests.Response = requests.post(
-                    rpc_url, json=batch_requests, timeout=15
+                post_kwargs = (
+                    compression.post_kwargs(batch_requests)
+                    if compression
+                    else {"json": batch_requests}
                 )
+                with timed("rpc_wait"):
+                    response: requests.Response = http.post(rpc_url, timeout=15, **post_kwargs)
 
                 if response.status_code == 200:
-                    raw_responses = response.json()
+                    raw_responses = decode_json(response)
                     responses.extend(JsonRPCRequest.standardize_response(raw_responses))
                 else:
+                    response.close()
                     error_response = {"code": response.status_code, "message": response.reason}
                     responses.extend(
                         JsonRPCResponse(result=None, error=error_response)
@@ -147,7 +197,13 @@ class JsonRPCRequest:
                 )
             ]
         elif isinstance(raw_responses, list):
-            # Batch response case
+            # Batch response case; servers may answer out of order, so restore request order
+            # whenever every entry carries the positional id assigned in send
+            if raw_responses and all(
+                isinstance(response, dict) and isinstance(response.get("id"), int)
+                for response in raw_responses
+            ):
+                raw_responses = sorted(raw_responses, key=lambda response: response["id"])
             return [
                 JsonRPCResponse(
                     result=response.get("result", response),  # Use raw response if no "result"
@@ -0,0 +1,188 @@
+"""Adaptive chunking and parallel dispatch of batched JSON-RPC calls."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcCompression import CompressionConfig
+from exporter.rpcDebug import CycleTimings
+from exporter.rpcTransport import create_session
+
+# HTTP status codes with which servers reject a batch for its size: oversized body, URI
+# or headers. Other errors, e.g. a transient 400, say nothing about the batch size.
+REJECTION_CODES = {413, 414, 431}
+
+
+def is_batch_size_error(error: Any) -> bool:
+    """Check whether an error response rejects a batch for its size.
+
+    Besides the HTTP status codes in REJECTION_CODES, providers answer oversized batches
+    with JSON-RPC errors like "batch too large" or "batch size limit exceeded".
+    """
+    if not isinstance(error, dict):
+        return False
+    if error.get("code") in REJECTION_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return "batch" in message and any(
+        word in message for word in ("size", "large", "limit", "exceed")
+    )
+
+
+class AdaptiveBatcher:
+    """Split batched JSON-RPC calls into chunks and send them concurrently.
+
+    The chunk size starts at max_chunk_size and is learned from the server's behaviour:
+    a chunk rejected for its size halves it (and is retried in two halves), a chunk
+    slower than target_latency shrinks it proportionally and a fast full chunk grows it
+    by one step, up to a ceiling below the smallest size the server has rejected. The
+    ceiling itself is raised by one step after ceiling_recovery successful chunks at it,
+    so a rejection caused by a temporary server limit does not pin the size for good.
+    Chunks are sent over a pooled session and reassembled in request order.
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        logger: Optional[logging.Logger] = None,
+        max_chunk_size: int = 100,
+        min_chunk_size: int = 1,
+        max_workers: int = 4,
+        target_latency: float = 2.0,
+        growth_step: int = 10,
+        ceiling_recovery: int = 20,
+        compression: Optional[CompressionConfig] = None,
+        session: Optional[Any] = None,
+        timings: Optional[CycleTimings] = None,
+    ) -> None:
+        """Initialize the batcher.
+
+        Args:
+            rpc_url: URL of the JSON-RPC endpoint.
+            logger: Logger used for errors and chunk size changes.
+            max_chunk_size: Upper bound (and initial value) of the chunk size.
+            min_chunk_size: Lower bound of the chunk size.
+            max_workers: Number of chunks in flight at once, also the connection pool size.
+            target_latency: Chunk round trip time in seconds the chunk size is tuned for.
+            growth_step: Number of requests added to the chunk size after a fast chunk.
+            ceiling_recovery: Number of successful full chunks at the ceiling learned from
+                rejections after which the ceiling is raised by growth_step.
+            compression: Optional content-coding negotiation and body compression.
+            session: Session to send chunks with, see rpcTransport.create_session.
+                Defaults to a pooled HTTP/1.1 session with max_workers connections.
+            timings: Optional cycle timings receiving the rpc_wait, transfer and decode
+                phases.
+        """
+        if min_chunk_size < 1 or max_chunk_size < min_chunk_size:
+            raise ValueError(
+                f"Invalid chunk size bounds: min={min_chunk_size}, max={max_chunk_size}"
+            )
+        self.rpc_url = rpc_url
+        self.logger = logger
+        self.max_chunk_size = max_chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_workers = max(1, max_workers)
+        self.target_latency = target_latency
+        self.growth_step = growth_step
+        self.ceiling_recovery = max(1, ceiling_recovery)
+        self.compression = compression
+        self.timings = timings
+        self.chunk_size = max_chunk_size
+        self._ceiling = max_chunk_size
+        self._chunks_at_ceiling = 0
+
+        self.session = session if session is not None else create_session("http1", max_workers)
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def send(self, rpc_requests: List[JsonRPCRequest]) -> List[JsonRPCResponse]:
+        """Send the requests in chunks and return the responses in request order."""
+        if not rpc_requests:
+            return []
+        size = self.chunk_size
+        chunks = [rpc_requests[i : i + size] for i in range(0, len(rpc_requests), size)]
+        if len(chunks) == 1 or self.max_workers == 1:
+            results = [self._send_chunk(chunk) for chunk in chunks]
+        else:
+            results = list(self._get_executor().map(self._send_chunk, chunks))
+        return [response for chunk_responses in results for response in chunk_responses]
+
+    def close(self) -> None:
+        """Release the worker threads and pooled connections."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="rpc-batch"
+            )
+        return self._executor
+
+    def _send_chunk(self, chunk: List[JsonRPCRequest]) -> List[JsonRPCResponse]:
+        """Send one chunk, splitting it in halves for as long as the server rejects it."""
+        started = time.monotonic()
+        responses = JsonRPCRequest.send(
+            rpc_url=self.rpc_url,
+            rpc_requests=chunk,
+            logger=self.logger,
+            session=self.session,
+            compression=self.compression,
+            timings=self.timings,
+        )
+        elapsed = time.monotonic() - started
+
+        if len(chunk) > 1 and self._is_rejection(chunk, responses):
+            with self._lock:
+                self._ceiling = max(self.min_chunk_size, min(self._ceiling, len(chunk) - 1))
+                self._chunks_at_ceiling = 0
+            self._shrink(len(chunk) // 2, f"batch of {len(chunk)} rejected")
+            middle = len(chunk) // 2
+            return self._send_chunk(chunk[:middle]) + self._send_chunk(chunk[middle:])
+        if len(responses) != len(chunk):
+            # A single error for the whole batch that is not about its size, e.g. an
+            # overloaded node: report it for every request
+            error = next((r.error for r in responses if r.error), None) or {
+                "message": f"Expected {len(chunk)} responses, got {len(responses)}"
+            }
+            responses = [JsonRPCResponse(result=None, error=error) for _ in chunk]
+
+        if elapsed > self.target_latency:
+            scaled = int(len(chunk) * self.target_latency / elapsed)
+            self._shrink(scaled, f"batch of {len(chunk)} took {elapsed:.2f}s")
+        elif len(chunk) >= self.chunk_size and all(r.is_successful() for r in responses):
+            self._grow()
+        return responses
+
+    @staticmethod
+    def _is_rejection(chunk: List[JsonRPCRequest], responses: List[JsonRPCResponse]) -> bool:
+        """Check whether the server refused the chunk as a whole for its size."""
+        if len(responses) != len(chunk):
+            return any(is_batch_size_error(response.error) for response in responses)
+        return all(is_batch_size_error(response.error) for response in responses)
+
+    def _shrink(self, size: int, reason: str) -> None:
+        with self._lock:
+            new_size = max(self.min_chunk_size, min(size, self.chunk_size))
+            if new_size < self.chunk_size:
+                if self.logger:
+                    self.logger.info(
+                        f"Reducing batch chunk size {self.chunk_size} -> {new_size}: {reason}"
+                    )
+                self.chunk_size = new_size
+
+    def _grow(self) -> None:
+        with self._lock:
+            if self.chunk_size >= self._ceiling and self._ceiling < self.max_chunk_size:
+                self._chunks_at_ceiling += 1
+                if self._chunks_at_ceiling >= self.ceiling_recovery:
+                    self._ceiling = min(self.max_chunk_size, self._ceiling + self.growth_step)
+                    self._chunks_at_ceiling = 0
+            self.chunk_size = min(self._ceiling, self.chunk_size + self.growth_step)
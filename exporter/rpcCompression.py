@@ -0,0 +1,105 @@
+"""Compressed transfer of JSON-RPC requests and responses."""
+
+import gzip
+import json
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, ContextManager, Dict, Optional
+
+import requests
+from urllib3.exceptions import HTTPError
+from urllib3.response import HTTPResponse
+from urllib3.util.request import ACCEPT_ENCODING
+
+from exporter.rpcDebug import CycleTimings
+
+# Content codings urllib3 can decode here: gzip and deflate always, br and zstd only when
+# the brotli / zstandard packages are installed.
+AVAILABLE_ENCODINGS = ACCEPT_ENCODING.split(",")
+
+
+@dataclass
+class CompressionConfig:
+    """Content-coding negotiation and request body compression for JsonRPCRequest.send.
+
+    Responses are requested as a stream, decompressed by urllib3 while they are read
+    from the socket and handed to the JSON decoder as bytes, skipping the buffered
+    text copy requests' Response.json() makes. The request returns once the headers
+    have arrived, so receiving the body is measured as its own transfer phase.
+    """
+
+    accept_encoding: str = ", ".join(AVAILABLE_ENCODINGS)
+    request_min_bytes: Optional[int] = None
+    stream: bool = True
+
+    @classmethod
+    def from_config(
+        cls, accept_encoding: Optional[str], request_min_bytes: Optional[str]
+    ) -> "CompressionConfig":
+        """Create a config from the optional exporter configuration values.
+
+        Args:
+            accept_encoding: Comma separated codings in order of preference. Codings that
+                cannot be decoded here are dropped; "identity" disables compression.
+            request_min_bytes: Size from which batch request bodies are gzip compressed.
+        """
+        config = cls()
+        if accept_encoding:
+            wanted = [coding.strip() for coding in accept_encoding.split(",")]
+            supported = [c for c in wanted if c in AVAILABLE_ENCODINGS or c == "identity"]
+            if not supported:
+                raise ValueError(
+                    f"None of the encodings {wanted} is supported, "
+                    f"available: {AVAILABLE_ENCODINGS}"
+                )
+            config.accept_encoding = ", ".join(supported)
+        if request_min_bytes:
+            config.request_min_bytes = int(request_min_bytes)
+        return config
+
+    def get_kwargs(self) -> Dict[str, Any]:
+        """Return the keyword arguments for a GET request."""
+        return {"headers": {"Accept-Encoding": self.accept_encoding}, "stream": self.stream}
+
+    def post_kwargs(self, payload: Any) -> Dict[str, Any]:
+        """Return the keyword arguments for a POST request carrying payload as JSON."""
+        kwargs = self.get_kwargs()
+        if self.request_min_bytes is None:
+            kwargs["json"] = payload
+            return kwargs
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        kwargs["headers"]["Content-Type"] = "application/json"
+        if len(body) >= self.request_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            kwargs["headers"]["Content-Encoding"] = "gzip"
+        kwargs["data"] = body
+        return kwargs
+
+    def decode_json(self, response: Any, timings: Optional[CycleTimings] = None) -> Any:
+        """Decode a JSON response body, streaming it from the socket when possible.
+
+        Args:
+            response: Response returned for a request sent with get_kwargs/post_kwargs.
+            timings: Optional cycle timings. A streamed body is received and decompressed
+                after the request returns, which is recorded as the transfer phase,
+                separately from parsing it in the decode phase.
+        """
+
+        def timed(phase: str) -> ContextManager[None]:
+            return timings.measure(phase) if timings else nullcontext()
+
+        raw = getattr(response, "raw", None)
+        if not self.stream or not isinstance(raw, HTTPResponse):
+            with timed("decode"):
+                return response.json()
+        try:
+            with timed("transfer"):
+                raw.decode_content = True
+                body = raw.read()
+            with timed("decode"):
+                return json.loads(body)
+        except (ValueError, HTTPError) as e:
+            # Surface like requests' own decoding errors so send reports them per request
+            raise requests.RequestException(f"Failed to decode response: {e}") from e
+        finally:
+            response.close()
@@ -0,0 +1,296 @@
+"""Opt-in debug endpoints for profiling the collection loop."""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Thread name prefixes of the pools sending requests on behalf of the collecting thread
+_POOL_THREAD_PREFIXES = ("rpc-batch", "rpc-collect")
+# Frame of concurrent.futures running a work item; pool threads without it are idle
+_POOL_WORK_FRAME = "run (thread.py)"
+
+
+class CycleTimings:
+    """Per-cycle breakdown of where collect_metrics spends its time.
+
+    Phases are accumulated from any thread. rpc_calls is the wall time during which at
+    least one RPCExporter._rpc_call/_batched_rpc_call is in progress, so concurrent calls
+    of the scheduler's fetches are counted once. rpc_wait (until the response headers),
+    transfer (receiving a streamed body) and decode (parsing it) are summed over the
+    threads sending requests, so they can exceed rpc_calls when chunks run in parallel.
+    metric_update is the remainder of the cycle outside of RPC calls.
+    """
+
+    def __init__(self, history: int = 100) -> None:
+        """Initialize the timings, keeping the breakdown of the last history cycles."""
+        self.history: Deque[Dict[str, float]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._current: Dict[str, float] = defaultdict(float)
+        self._started: Optional[float] = None
+        self._cycle = 0
+        # Number of active measure_wall blocks and when the first of them started
+        self._depth: Dict[str, int] = defaultdict(int)
+        self._wall_started: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Add time spent in a phase to the current cycle."""
+        with self._lock:
+            self._current[phase] += seconds
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Measure the time spent in the with block as the given phase."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    @contextmanager
+    def measure_wall(self, phase: str) -> Iterator[None]:
+        """Measure the wall time during which any with block of the phase is active.
+
+        Unlike measure, overlapping blocks running in different threads are counted once.
+        """
+        with self._lock:
+            if self._depth[phase] == 0:
+                self._wall_started[phase] = time.perf_counter()
+            self._depth[phase] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._depth[phase] -= 1
+                if self._depth[phase] == 0:
+                    started = self._wall_started.pop(phase)
+                    self._current[phase] += time.perf_counter() - started
+
+    def begin_cycle(self) -> None:
+        """Start a new cycle."""
+        with self._lock:
+            self._current = defaultdict(float)
+            self._started = time.perf_counter()
+            # Blocks still active from the previous cycle only count from now on
+            for phase in self._wall_started:
+                self._wall_started[phase] = self._started
+
+    def end_cycle(self) -> Dict[str, float]:
+        """Finish the current cycle and return its breakdown."""
+        with self._lock:
+            now = time.perf_counter()
+            total = now - (self._started or now)
+            for phase, started in self._wall_started.items():
+                self._current[phase] += now - started
+                self._wall_started[phase] = now
+            self._cycle += 1
+            entry = {"cycle": self._cycle, "total": total, **self._current}
+            entry["metric_update"] = max(0.0, total - self._current["rpc_calls"])
+            self.history.append(entry)
+            return entry
+
+
+class CollectionProfiler:
+    """Sampling CPU profiler and tracemalloc diffs scoped to collect cycles."""
+
+    def __init__(self, timings: CycleTimings, interval: float = 0.005) -> None:
+        """Initialize the profiler.
+
+        Args:
+            timings: Timings whose cycles are started and finished with each cycle.
+            interval: Seconds between two stack samples while profiling.
+        """
+        self.timings = timings
+        self.interval = interval
+        self._cond = threading.Condition()
+        # Serializes starting, stopping and snapshotting tracemalloc across threads
+        self._tracemalloc_lock = threading.Lock()
+        self._completed = 0
+        self._running = False
+        self._thread_id: Optional[int] = None
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._diff: List[str] = []
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Wrap one collect cycle."""
+        with self._cond:
+            self._thread_id = threading.get_ident()
+            self._running = True
+        self.timings.begin_cycle()
+        try:
+            yield
+        finally:
+            try:
+                self.timings.end_cycle()
+                self._take_tracemalloc_snapshot()
+            finally:
+                with self._cond:
+                    self._running = False
+                    self._completed += 1
+                    self._cond.notify_all()
+
+    def profile(self, cycles: int, timeout: float) -> str:
+        """Sample the collecting thread and the request pool threads over the next cycles.
+
+        Args:
+            cycles: Number of complete cycles to profile; a cycle in progress is skipped.
+            timeout: Maximum number of seconds to sample.
+
+        Returns:
+            Collapsed stacks, one "thread;root;...;leaf count" line per distinct stack.
+        """
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            first = self._completed + (1 if self._running else 0)
+        while time.monotonic() < deadline:
+            with self._cond:
+                if self._completed >= first + cycles:
+                    break
+                sampling = self._running and self._completed >= first
+                thread_id = self._thread_id
+            if sampling and thread_id is not None:
+                for stack in self._sample(thread_id):
+                    stacks[stack] += 1
+            time.sleep(self.interval)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    @classmethod
+    def _sample(cls, thread_id: int) -> List[str]:
+        """Return the stacks of the collecting thread and busy pool threads.
+
+        Requests and decoding run in the batcher's and scheduler's pools, so their
+        threads are sampled too. Each stack starts with the name of its thread.
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, str(ident))
+            if ident != thread_id and not name.startswith(_POOL_THREAD_PREFIXES):
+                continue
+            stack = cls._collapse(frame)
+            if ident != thread_id and _POOL_WORK_FRAME not in stack:
+                continue
+            stacks.append(f"{name};{stack}")
+        return stacks
+
+    @staticmethod
+    def _collapse(frame: Any) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def tracemalloc_diff(self, top: int = 25) -> str:
+        """Return the allocation diff between the last two cycles, starting tracing if needed."""
+        with self._tracemalloc_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                return "tracemalloc started, a diff is available after two collect cycles\n"
+            diff = self._diff
+        if not diff:
+            return "no diff yet, waiting for two collect cycles\n"
+        return "".join(f"{line}\n" for line in diff[:top])
+
+    def stop_tracemalloc(self) -> None:
+        """Stop tracing allocations and drop the stored snapshot."""
+        with self._tracemalloc_lock:
+            tracemalloc.stop()
+            self._previous_snapshot = None
+            self._diff = []
+
+    def _take_tracemalloc_snapshot(self) -> None:
+        # Checked under the lock, so tracing cannot be stopped before the snapshot is taken
+        with self._tracemalloc_lock:
+            if not tracemalloc.is_tracing():
+                return
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            if self._previous_snapshot is not None:
+                self._diff = [
+                    str(stat) for stat in snapshot.compare_to(self._previous_snapshot, "lineno")
+                ]
+            self._previous_snapshot = snapshot
+
+
+def _make_handler(
+    profiler: CollectionProfiler, poll_interval: float, logger: Optional[logging.Logger]
+) -> type:
+    class DebugHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == "/debug/profile":
+                    cycles = int(query.get("cycles", "1"))
+                    timeout = float(query.get("timeout", (cycles + 1) * poll_interval * 2 + 60))
+                    self._reply(200, profiler.profile(cycles, timeout))
+                elif url.path == "/debug/tracemalloc":
+                    if query.get("stop"):
+                        profiler.stop_tracemalloc()
+                        self._reply(200, "tracemalloc stopped\n")
+                    else:
+                        self._reply(200, profiler.tracemalloc_diff(int(query.get("top", "25"))))
+                elif url.path == "/debug/timings":
+                    history = list(profiler.timings.history)[-int(query.get("cycles", "10")) :]
+                    self._reply(200, json.dumps(history, indent=2), "application/json")
+                else:
+                    self._reply(404, "not found\n")
+            except ValueError as e:
+                self._reply(400, f"{e}\n")
+
+        def _reply(self, status: int, body: str, content_type: str = "text/plain") -> None:
+            payload = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            if logger:
+                logger.debug(f"debug server: {format % args}")
+
+    return DebugHandler
+
+
+def start_debug_server(
+    port: int,
+    profiler: CollectionProfiler,
+    poll_interval: float,
+    addr: str = "127.0.0.1",
+    logger: Optional[logging.Logger] = None,
+) -> ThreadingHTTPServer:
+    """Serve the debug endpoints from a daemon thread.
+
+    Endpoints:
+        /debug/profile?cycles=N: collapsed stacks sampled over the next N collect cycles.
+        /debug/tracemalloc[?top=N|?stop=1]: allocation diff between the last two cycles.
+        /debug/timings?cycles=N: JSON breakdown of the last N cycles.
+
+    Args:
+        port: Port to listen on.
+        profiler: Profiler wrapping the collect cycles.
+        poll_interval: Seconds between cycles, used for the default profile timeout.
+        addr: Address to bind, localhost by default.
+        logger: Logger for request logs.
+
+    Returns:
+        The running server.
+    """
+    server = ThreadingHTTPServer((addr, port), _make_handler(profiler, poll_interval, logger))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="debug-server", daemon=True).start()
+    return server
@@ -1,12 +1,24 @@
 import logging
+import time
 import warnings
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 from prometheus_client import CollectorRegistry
 
 from exporter.jsonRPCRequest import JsonRPCRequest
 from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcBatcher import AdaptiveBatcher
+from exporter.rpcCompression import CompressionConfig
+from exporter.rpcDebug import CollectionProfiler, CycleTimings, start_debug_server
 from exporter.rpcExporterConfig import ExporterConfig
+from exporter.rpcPush import create_pusher
+from exporter.rpcRefreshGraph import RefreshGraph
+from exporter.rpcScheduler import CollectionScheduler
+from exporter.rpcSharedCache import SharedResponseCache
+from exporter.rpcSnapshot import StateSnapshot, WarmStartRegistry
+from exporter.rpcTimeSeries import TimeSeriesStore
+from exporter.rpcTransport import create_session, is_unix_url, normalize_url
+from exporter.rpcWorker import CollectorWorker, Publish
 
 
 class RPCExporter:
@@ -96,10 +108,11 @@ class RPCExporter:
             config_source, config_keys, file_path=config_file, required_keys=required_keys
         )
 
-        self.rpc_url: str | None = self.config.rpc_url or self._raise_config_error(
-            key="rpc_url"
+        # unix:// URLs are rewritten to http+unix:// for the Unix socket adapter
+        self.rpc_url: str = normalize_url(
+            self.config.rpc_url or self._raise_config_error(key="rpc_url")
         )
-        self.public_rpc_url: str | None = (
+        self.public_rpc_url: str = normalize_url(
             self.config.public_rpc_url or self._raise_config_error(key="public_rpc_url")
         )
 
@@ -115,21 +128,170 @@ class RPCExporter:
 
         self.registry = CollectorRegistry()
 
-    def _raise_config_error(self, key: str) -> None:
+        self.timings = CycleTimings()
+        self.profiler = CollectionProfiler(self.timings)
+        debug_port = self.config.get("debug_port")
+        self.debug_port: Optional[int] = int(debug_port) if debug_port else None
+
+        self.compression = CompressionConfig.from_config(
+            accept_encoding=self.config.get("accept_encoding"),
+            request_min_bytes=self.config.get("compress_request_min_bytes"),
+        )
+        batch_workers = int(self.config.get("batch_workers", "4"))
+        # One session per endpoint; subclasses call public_rpc_url via _public_rpc_call or
+        # pass public_session to JsonRPCRequest.send
+        rpc_transport = self.config.get("rpc_transport", "http1")
+        public_rpc_transport = self.config.get("public_rpc_transport", "http1")
+        for url, transport in (
+            (self.rpc_url, rpc_transport),
+            (self.public_rpc_url, public_rpc_transport),
+        ):
+            if is_unix_url(url) and transport != "http1":
+                raise ValueError(f"Unix socket URL {url} requires the http1 transport.")
+        self.session = create_session(rpc_transport, pool_maxsize=batch_workers)
+        self.public_session = create_session(public_rpc_transport)
+        self.batcher = AdaptiveBatcher(
+            rpc_url=self.rpc_url,
+            logger=self.logger,
+            max_chunk_size=int(self.config.get("max_batch_size", "100")),
+            max_workers=batch_workers,
+            compression=self.compression,
+            session=self.session,
+            timings=self.timings,
+        )
+        # Subclasses register sentinel and derived requests in setup_metrics and call
+        # self.refresh_graph.refresh() at the start of collect_metrics
+        self.refresh_graph = RefreshGraph(self._batched_rpc_call, logger=self.logger)
+        # Subclasses submit prioritised fetches in collect_metrics and call
+        # self.scheduler.run(), which publishes each result as soon as it resolves
+        collection_budget = self.config.get("collection_budget")
+        self.scheduler = CollectionScheduler(
+            max_workers=int(self.config.get("collection_workers", "4")),
+            budget=float(collection_budget) if collection_budget else None,
+            logger=self.logger,
+        )
+        # Subclasses append values in collect_metrics and publish rates computed over them
+        self.series = TimeSeriesStore(
+            capacity=int(self.config.get("series_capacity", "360")),
+            max_series=int(self.config.get("series_max", "10000")),
+        )
+
+        shared_cache_dir = self.config.get("shared_cache_dir")
+        self.shared_cache: Optional[SharedResponseCache] = (
+            SharedResponseCache(
+                shared_cache_dir,
+                ttl=float(self.config.get("shared_cache_ttl", str(self.poll_interval))),
+                logger=self.logger,
+            )
+            if shared_cache_dir
+            else None
+        )
+
+        snapshot_file = self.config.get("snapshot_file")
+        self.snapshot: Optional[StateSnapshot] = (
+            StateSnapshot(snapshot_file, logger=self.logger) if snapshot_file else None
+        )
+        self.snapshot_interval = int(self.config.get("snapshot_interval", "60"))
+
+        push_mode = self.config.get("push_mode")
+        self.pusher = (
+            create_pusher(
+                push_mode,
+                url=self.config.get("push_url") or self._raise_config_error("push_url"),
+                job=self.config.get("push_job", self.__class__.__name__.lower()),
+                instance=self.config.get("push_instance"),
+                logger=self.logger,
+            )
+            if push_mode
+            else None
+        )
+
+        self.collector_process = self.config.get("collector_process", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+    def _raise_config_error(self, key: str) -> NoReturn:
         """Raise a configuration error for a missing key."""
         raise ValueError(f"Missing configuration key: {key}")
 
     def _rpc_call(self, request: JsonRPCRequest) -> List[JsonRPCResponse]:
         """Make an individual JSON-RPC call."""
-        return JsonRPCRequest.send(
-            rpc_url=self.rpc_url, rpc_requests=request, logger=self.logger
-        )
+        with self.timings.measure_wall("rpc_calls"):
+            return self._cached(
+                self.rpc_url,
+                [request],
+                lambda: JsonRPCRequest.send(
+                    rpc_url=self.rpc_url,
+                    rpc_requests=request,
+                    logger=self.logger,
+                    session=self.session,
+                    compression=self.compression,
+                    timings=self.timings,
+                ),
+            )
 
     def _batched_rpc_call(self, requests: List[JsonRPCRequest]) -> List[JsonRPCResponse]:
-        """Make a batched JSON-RPC call."""
-        return JsonRPCRequest.send(
-            rpc_url=self.rpc_url, rpc_requests=requests, logger=self.logger
+        """Make a batched JSON-RPC call, split into adaptively sized parallel chunks."""
+        with self.timings.measure_wall("rpc_calls"):
+            return self._cached(self.rpc_url, requests, lambda: self.batcher.send(requests))
+
+    def _public_rpc_call(
+        self, requests: Union[JsonRPCRequest, List[JsonRPCRequest]]
+    ) -> List[JsonRPCResponse]:
+        """Make a single or batched JSON-RPC call to public_rpc_url."""
+        requests_list = [requests] if isinstance(requests, JsonRPCRequest) else requests
+        with self.timings.measure_wall("rpc_calls"):
+            return self._cached(
+                self.public_rpc_url,
+                requests_list,
+                lambda: JsonRPCRequest.send(
+                    rpc_url=self.public_rpc_url,
+                    rpc_requests=requests,
+                    logger=self.logger,
+                    session=self.public_session,
+                    compression=self.compression,
+                    timings=self.timings,
+                ),
+            )
+
+    def _cached(
+        self,
+        rpc_url: str,
+        requests: List[JsonRPCRequest],
+        fetch: Callable[[], List[JsonRPCResponse]],
+    ) -> List[JsonRPCResponse]:
+        """Serve a call from the shared cache if one is configured, otherwise fetch it."""
+        if self.shared_cache is None:
+            return fetch()
+        return self.shared_cache.get_or_fetch(rpc_url, requests, fetch)
+
+    def save_snapshot(self) -> bool:
+        """Write the current metric samples and refresh graph results to the snapshot file."""
+        if self.snapshot is None:
+            return False
+        return self.snapshot.write(self.registry.collect(), self.refresh_graph.export_state())
+
+    def _restore_snapshot(self) -> Optional[WarmStartRegistry]:
+        """Load the snapshot file and restore the cached refresh graph results.
+
+        Returns:
+            Registry view serving the snapshot until the first collection completes, or
+            None if there is no usable snapshot.
+        """
+        if self.snapshot is None:
+            return None
+        loaded = self.snapshot.load()
+        if loaded is None:
+            return None
+        written_at, families, cache_state = loaded
+        restored = self.refresh_graph.load_state(cache_state)
+        self.logger.info(
+            f"Serving snapshot from {self.snapshot.path} written {time.time() - written_at:.0f}s "
+            f"ago, restored cached responses: {restored}"
         )
+        return WarmStartRegistry(self.registry, families, written_at)
 
     def setup_metrics(self) -> None:
         """Initialize Prometheus metrics. To be implemented by subclasses."""
@@ -141,11 +303,54 @@ class RPCExporter:
 
     def start_exporter(self) -> None:
         """Start the Prometheus metrics exporter."""
-        import time
-
         from prometheus_client import start_http_server
 
-        start_http_server(self.exporter_port, registry=self.registry)
+        warm_start = self._restore_snapshot()
+        if self.collector_process:
+            # Fork the worker supervisor before the metrics server starts its threads
+            worker = CollectorWorker(
+                self._collect_loop, logger=self.logger, fallback=warm_start
+            )
+            worker.start()
+            start_http_server(self.exporter_port, registry=worker.registry)
+            worker.supervise()
+        else:
+            start_http_server(self.exporter_port, registry=warm_start or self.registry)
+            self._collect_loop(warm_start=warm_start)
+
+    def _collect_loop(
+        self,
+        publish: Optional[Publish] = None,
+        warm_start: Optional[WarmStartRegistry] = None,
+    ) -> None:
+        """Run collect cycles forever.
+
+        Args:
+            publish: Called with the registry's samples after every cycle, used to hand
+                them to the serving process when collecting in a worker process.
+            warm_start: Snapshot view to switch to live data after the first cycle.
+        """
+        if self.debug_port is not None:
+            start_debug_server(
+                port=self.debug_port,
+                profiler=self.profiler,
+                poll_interval=self.poll_interval,
+                addr=self.config.get("debug_address", "127.0.0.1"),
+                logger=self.logger,
+            )
+        last_snapshot = time.monotonic()
         while True:
-            self.collect_metrics()
+            with self.profiler.cycle():
+                self.collect_metrics()
+            if publish is not None:
+                publish(self.registry.collect())
+            if self.pusher is not None:
+                self.pusher.push(self.registry)
+            if warm_start is not None:
+                warm_start.mark_live()
+            if self.snapshot is not None and (
+                time.monotonic() - last_snapshot >= self.snapshot_interval
+            ):
+                self.save_snapshot()
+                last_snapshot = time.monotonic()
             time.sleep(self.poll_interval)
@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, Optional, overload
 
 
 @dataclass
@@ -67,6 +67,22 @@ class ExporterConfig:
         if missing_keys:
             raise ValueError(f"Configuration is missing required keys: {missing_keys}")
 
+    @overload
+    def get(self, name: str) -> Optional[str]: ...
+
+    @overload
+    def get(self, name: str, default: str) -> str: ...
+
+    @overload
+    def get(self, name: str, default: Optional[str]) -> Optional[str]: ...
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Return an optional configuration value, falling back to default if unset or unknown.
+        """
+        value = self._config.get(name)
+        return default if value is None else value
+
     def __getattr__(self, name: str) -> Optional[str]:
         """
         Allow attribute-style access to configuration values.
@@ -0,0 +1,283 @@
+"""Push exported samples to Prometheus remote_write receivers or a Pushgateway."""
+
+import logging
+import struct
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from prometheus_client import push_to_gateway
+from prometheus_client.metrics_core import Metric
+
+PUSH_MODES = ("remote_write", "pushgateway")
+
+# Creation timestamps prometheus_client exports next to counters, histograms and summaries.
+# Pushed as samples they would only add a series of timestamps per metric, so they are skipped.
+_CREATED_SUFFIX = "_created"
+
+Series = Tuple[List[Tuple[str, str]], float, int]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Encode a length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def encode_write_request(series: Iterable[Series]) -> bytes:
+    """Encode series as a remote_write WriteRequest protobuf message.
+
+    Args:
+        series: (labels, value, timestamp in ms) tuples, labels including __name__.
+
+    Returns:
+        The serialized, uncompressed WriteRequest.
+    """
+    message = bytearray()
+    for labels, value, timestamp_ms in series:
+        timeseries = b"".join(
+            _field(1, _field(1, name.encode()) + _field(2, label_value.encode()))
+            for name, label_value in sorted(labels)
+        )
+        sample = b"\x09" + struct.pack("<d", value) + b"\x10" + _varint(timestamp_ms)
+        message += _field(1, timeseries + _field(2, sample))
+    return bytes(message)
+
+
+def _snappy_literal_block(data: bytes) -> bytes:
+    """Frame data as a valid snappy block made of literals only, i.e. without compression."""
+    out = bytearray(_varint(len(data)))
+    for start in range(0, len(data), 65536):
+        chunk = data[start : start + 65536]
+        length = len(chunk) - 1
+        if length < 60:
+            out.append(length << 2)
+        elif length < 256:
+            out += bytes((60 << 2, length))
+        else:
+            out += bytes((61 << 2,)) + struct.pack("<H", length)
+        out += chunk
+    return bytes(out)
+
+
+def snappy_compress(data: bytes) -> bytes:
+    """Compress data in the snappy block format remote_write requires.
+
+    Uses python-snappy when installed and otherwise falls back to an uncompressed literal
+    block, which every receiver decodes but which does not save bandwidth.
+    """
+    try:
+        import snappy
+    except ImportError:
+        return _snappy_literal_block(data)
+    return snappy.compress(data)
+
+
+def families_to_series(
+    families: Iterable[Metric],
+    timestamp_ms: int,
+    external_labels: Optional[Dict[str, str]] = None,
+) -> List[Series]:
+    """Flatten metric families into remote_write series.
+
+    Args:
+        families: Metric families, e.g. from registry.collect().
+        timestamp_ms: Timestamp of samples that carry none themselves.
+        external_labels: Labels added to every series, overridden by sample labels.
+    """
+    series = []
+    for family in families:
+        for sample in family.samples:
+            if family.type != "gauge" and sample.name == family.name + _CREATED_SUFFIX:
+                continue
+            labels = {**(external_labels or {}), **sample.labels, "__name__": sample.name}
+            ts = (
+                int(float(sample.timestamp) * 1000)
+                if sample.timestamp is not None
+                else timestamp_ms
+            )
+            series.append((list(labels.items()), float(sample.value), ts))
+    return series
+
+
+class RemoteWritePusher:
+    """Send samples to a Prometheus remote_write endpoint with a bounded retry queue.
+
+    Each push splits the samples into WriteRequests of at most max_batch_series series
+    and appends them to the queue, which is then flushed in order. Batches rejected with
+    a server error, 429 or a connection error stay queued for the next push; other
+    client errors drop the batch, as remote_write receivers will never accept it.
+    When the queue is full, the oldest batches are dropped first.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        logger: Optional[logging.Logger] = None,
+        max_batch_series: int = 2000,
+        max_queued_batches: int = 100,
+        timeout: float = 10,
+        session: Optional[Any] = None,
+        external_labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Initialize the pusher.
+
+        Args:
+            url: remote_write endpoint, e.g. http://prometheus:9090/api/v1/write.
+            logger: Logger used to report failed or dropped batches.
+            max_batch_series: Maximum number of series per request.
+            max_queued_batches: Maximum number of batches kept for retries.
+            timeout: Request timeout in seconds.
+            session: Session used to send, a new requests.Session by default.
+            external_labels: Labels added to every series, e.g. job and instance, which
+                a scrape would otherwise have attached.
+        """
+        self.url = url
+        self.logger = logger
+        self.max_batch_series = max_batch_series
+        self.timeout = timeout
+        self.session = session if session is not None else requests.Session()
+        self.external_labels = external_labels or {}
+        self.queue: Deque[bytes] = deque(maxlen=max_queued_batches)
+        self.dropped = 0
+
+    def push(self, registry: Any, timestamp_ms: Optional[int] = None) -> int:
+        """Queue the registry's current samples and flush the queue.
+
+        Returns:
+            Number of batches still queued for a retry.
+        """
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        series = families_to_series(registry.collect(), timestamp_ms, self.external_labels)
+        for start in range(0, len(series), self.max_batch_series):
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+                if self.logger:
+                    self.logger.warning("remote_write queue full, dropping oldest batch")
+            batch = series[start : start + self.max_batch_series]
+            self.queue.append(snappy_compress(encode_write_request(batch)))
+        self.flush()
+        return len(self.queue)
+
+    def flush(self) -> None:
+        """Send queued batches in order until one fails with a retryable error."""
+        while self.queue:
+            try:
+                response = self.session.post(
+                    self.url,
+                    data=self.queue[0],
+                    headers={
+                        "Content-Encoding": "snappy",
+                        "Content-Type": "application/x-protobuf",
+                        "X-Prometheus-Remote-Write-Version": "0.1.0",
+                    },
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                if self.logger:
+                    self.logger.error(f"remote_write to {self.url} failed, will retry: {e}")
+                return
+            if response.status_code == 429 or response.status_code >= 500:
+                if self.logger:
+                    self.logger.error(
+                        f"remote_write to {self.url} failed with {response.status_code}, "
+                        "will retry"
+                    )
+                return
+            self.queue.popleft()
+            if response.status_code >= 400:
+                self.dropped += 1
+                if self.logger:
+                    self.logger.error(
+                        f"remote_write to {self.url} rejected batch with "
+                        f"{response.status_code}: {response.text[:200]}"
+                    )
+
+
+class PushgatewayPusher:
+    """Replace the exporter's group on a Pushgateway with the registry's samples.
+
+    A push replaces the whole group, so a failed push needs no queue: the next push
+    carries the then current samples.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        job: str,
+        grouping_key: Optional[Dict[str, str]] = None,
+        logger: Optional[logging.Logger] = None,
+        timeout: float = 10,
+    ) -> None:
+        """Initialize the pusher.
+
+        Args:
+            url: Pushgateway address, e.g. http://pushgateway:9091.
+            job: Job label of the pushed group.
+            grouping_key: Additional labels identifying the group, e.g. the instance.
+            logger: Logger used to report failed pushes.
+            timeout: Request timeout in seconds.
+        """
+        self.url = url
+        self.job = job
+        self.grouping_key = grouping_key or {}
+        self.logger = logger
+        self.timeout = timeout
+
+    def push(self, registry: Any, timestamp_ms: Optional[int] = None) -> int:
+        """Push the registry's current samples; the Pushgateway timestamps them itself.
+
+        Returns:
+            1 if the push failed, 0 otherwise.
+        """
+        try:
+            push_to_gateway(
+                self.url,
+                job=self.job,
+                registry=registry,
+                grouping_key=self.grouping_key,
+                timeout=self.timeout,
+            )
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f"Push to Pushgateway {self.url} failed: {e}")
+            return 1
+        return 0
+
+
+def create_pusher(
+    mode: str,
+    url: str,
+    job: str,
+    instance: Optional[str] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Any:
+    """Create a pusher for the given push mode.
+
+    Args:
+        mode: "remote_write" or "pushgateway".
+        url: remote_write endpoint or Pushgateway address.
+        job: Job label added to remote_write series or Pushgateway group.
+        instance: Optional instance label of the series or group.
+        logger: Logger used to report failed pushes.
+    """
+    if mode == "remote_write":
+        labels = {"job": job, **({"instance": instance} if instance else {})}
+        return RemoteWritePusher(url, logger=logger, external_labels=labels)
+    if mode == "pushgateway":
+        grouping_key = {"instance": instance} if instance else None
+        return PushgatewayPusher(url, job, grouping_key=grouping_key, logger=logger)
+    raise ValueError(f"Unknown push mode '{mode}'. Use one of {PUSH_MODES}.")
@@ -0,0 +1,212 @@
+"""Dependency-driven refresh of slow-changing JSON-RPC data."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+
+_UNSET = object()
+
+
+@dataclass
+class RefreshNode:
+    """A registered request and the last result obtained for it."""
+
+    name: str
+    request: JsonRPCRequest
+    depends_on: Tuple[str, ...] = ()
+    key: Optional[Callable[[Any], Hashable]] = None
+    level: int = 0
+    response: Optional[JsonRPCResponse] = None
+    version: Any = _UNSET
+    pending: bool = True
+    changed: bool = False
+
+    def is_sentinel(self) -> bool:
+        """Check if the node is a sentinel, i.e. fetched on every refresh."""
+        return not self.depends_on
+
+
+class RefreshGraph:
+    """Refresh expensive requests only when a cheap sentinel value changes.
+
+    Sentinels (e.g. getEpochInfo keyed on the epoch, getVersion) are fetched on every
+    refresh. Derived requests (e.g. getLeaderSchedule, getVoteAccounts) are fetched once
+    and then only again when the key of one of their dependencies changes; in between,
+    the last successful response is served. Derived requests may depend on other derived
+    requests, each level of the graph is fetched as one batch.
+
+    Example:
+        graph.sentinel("epoch", JsonRPCRequest("getEpochInfo"), key=lambda r: r["epoch"])
+        graph.derived("leaders", JsonRPCRequest("getLeaderSchedule"), depends_on=["epoch"])
+        graph.refresh()
+        schedule = graph.result("leaders")
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[JsonRPCRequest]], List[JsonRPCResponse]],
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Initialize the graph.
+
+        Args:
+            send: Callable sending a batch of requests, e.g. RPCExporter._batched_rpc_call.
+            logger: Logger used to report failed requests.
+        """
+        self.send = send
+        self.logger = logger
+        self.nodes: Dict[str, RefreshNode] = {}
+
+    def sentinel(
+        self,
+        name: str,
+        request: JsonRPCRequest,
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ) -> None:
+        """Register a cheap request that is fetched on every refresh.
+
+        Args:
+            name: Name used to look up the result and to declare dependencies.
+            request: Request to send.
+            key: Extracts the value whose change triggers dependants from the result.
+                Defaults to the whole result.
+        """
+        self._add(RefreshNode(name=name, request=request, key=key))
+
+    def derived(
+        self,
+        name: str,
+        request: JsonRPCRequest,
+        depends_on: Sequence[str],
+        key: Optional[Callable[[Any], Hashable]] = None,
+    ) -> None:
+        """Register a request that is only refreshed when one of its dependencies changes.
+
+        Args:
+            name: Name used to look up the result and to declare dependencies.
+            request: Request to send.
+            depends_on: Names of already registered sentinels or derived requests.
+            key: Extracts the value whose change triggers dependants from the result.
+                Defaults to the whole result.
+        """
+        if not depends_on:
+            raise ValueError(f"Derived request '{name}' must depend on at least one node.")
+        unknown = [dep for dep in depends_on if dep not in self.nodes]
+        if unknown:
+            raise ValueError(f"Derived request '{name}' depends on unknown nodes: {unknown}")
+        level = 1 + max(self.nodes[dep].level for dep in depends_on)
+        self._add(
+            RefreshNode(
+                name=name, request=request, depends_on=tuple(depends_on), key=key, level=level
+            )
+        )
+
+    def _add(self, node: RefreshNode) -> None:
+        if node.name in self.nodes:
+            raise ValueError(f"Request '{node.name}' is already registered.")
+        self.nodes[node.name] = node
+
+    def refresh(self) -> List[str]:
+        """Fetch all sentinels and every derived request whose dependencies changed.
+
+        Returns:
+            Names of the requests that were sent in this refresh.
+        """
+        for node in self.nodes.values():
+            node.changed = False
+
+        sent: List[str] = []
+        for level in sorted({node.level for node in self.nodes.values()}):
+            due = [
+                node
+                for node in self.nodes.values()
+                if node.level == level and self._is_due(node)
+            ]
+            # GET and POST requests cannot share a batch
+            for use_get in (False, True):
+                group = [node for node in due if node.request.use_get is use_get]
+                if group:
+                    self._fetch(group)
+                    sent.extend(node.name for node in group)
+        return sent
+
+    def _is_due(self, node: RefreshNode) -> bool:
+        if node.is_sentinel():
+            return True
+        if any(self.nodes[dep].changed for dep in node.depends_on):
+            node.pending = True
+        return node.pending
+
+    def _fetch(self, nodes: List[RefreshNode]) -> None:
+        responses = self.send([node.request for node in nodes])
+        for node, response in zip(nodes, responses):
+            if not response.is_successful():
+                if self.logger:
+                    response.log_error(self.logger, node.request.method)
+                # Keep serving the last good result and retry on the next refresh
+                if node.response is None:
+                    node.response = response
+                continue
+            try:
+                version = node.key(response.result) if node.key else response.result
+            except Exception as e:
+                # A null or malformed result is treated like a failed response
+                if self.logger:
+                    self.logger.error(
+                        f"Failed to extract the key of {node.request.method} from its "
+                        f"result: {e}"
+                    )
+                continue
+            node.changed = node.version is _UNSET or version != node.version
+            node.version = version
+            node.response = response
+            node.pending = False
+
+    def export_state(self) -> Dict[str, Any]:
+        """Return the successful results and keys of all nodes, e.g. for a snapshot."""
+        return {
+            node.name: {
+                "method": node.request.method,
+                "params": node.request.params,
+                "result": node.response.result,
+                "version": node.version,
+            }
+            for node in self.nodes.values()
+            if node.response is not None
+            and node.response.is_successful()
+            and node.version is not _UNSET
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> List[str]:
+        """Restore results exported by export_state for nodes whose request is unchanged.
+
+        Restored derived requests are not re-sent until a dependency changes.
+
+        Returns:
+            Names of the restored nodes.
+        """
+        restored = []
+        for name, entry in state.items():
+            node = self.nodes.get(name)
+            if node is None or (node.request.method, node.request.params) != (
+                entry["method"],
+                entry["params"],
+            ):
+                continue
+            node.response = JsonRPCResponse(result=entry["result"], error=None)
+            node.version = entry["version"]
+            node.pending = False
+            restored.append(name)
+        return restored
+
+    def get(self, name: str) -> Optional[JsonRPCResponse]:
+        """Return the last response for a registered request, None if never fetched."""
+        return self.nodes[name].response
+
+    def result(self, name: str) -> Any:
+        """Return the last successful result for a registered request, None if unavailable."""
+        response = self.nodes[name].response
+        return response.result if response is not None and response.is_successful() else None
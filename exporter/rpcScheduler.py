@@ -0,0 +1,211 @@
+"""Priority-ordered collection tasks publishing their metrics as soon as they resolve."""
+
+import heapq
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Task priorities, lower values are dispatched first
+CRITICAL = 0
+NORMAL = 1
+BULK = 2
+
+
+@dataclass
+class CollectionTask:
+    """A fetch whose result is handed to a handler updating the metrics."""
+
+    name: str
+    fetch: Callable[[], Any]
+    handle: Callable[[Any], None]
+    priority: int = NORMAL
+
+
+@dataclass
+class ScheduleResult:
+    """Outcome of one scheduler run, listing task names."""
+
+    completed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    # Bulk tasks not dispatched because the budget was used up
+    skipped: List[str] = field(default_factory=list)
+    # Tasks still running when the budget ran out
+    pending: List[str] = field(default_factory=list)
+
+
+class CollectionScheduler:
+    """Run the fetches of a collect cycle by priority within a time budget.
+
+    Tasks are dispatched to a thread pool in priority order, so cheap critical requests
+    (health, slot, delinquency) do not queue behind heavy bulk calls. Each handler runs
+    in the calling thread as soon as its fetch resolves, so the gauges it sets are
+    served by the next scrape even while other fetches are still running. Bulk tasks are
+    only dispatched while budget remains. When the budget runs out, run returns, fetches
+    still in flight keep running and the remaining non-bulk fetches are started; a task
+    of the same name submitted in a later cycle is not dispatched again but handles the
+    result of that fetch instead, also when it finished in between. Bulk and non-bulk
+    fetches run on separate pools of max_workers threads each, and fetches left in flight
+    count against their pool's limit, so stalled bulk fetches never delay critical ones.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        budget: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            max_workers: Number of bulk and of non-bulk fetches running at once.
+            budget: Default number of seconds a run may take, unlimited if None.
+            logger: Logger used to report failed, skipped and pending tasks.
+        """
+        self.max_workers = max(1, max_workers)
+        self.budget = budget
+        self.logger = logger
+        self._queue: List[Tuple[int, int, CollectionTask]] = []
+        self._sequence = 0
+        self._in_flight: Dict[str, Future] = {}
+        # Keyed by whether the pool runs bulk fetches
+        self._executors: Dict[bool, ThreadPoolExecutor] = {}
+        self._started: Dict[bool, Set[Future]] = {False: set(), True: set()}
+
+    def submit(
+        self,
+        name: str,
+        fetch: Callable[[], Any],
+        handle: Callable[[Any], None],
+        priority: int = NORMAL,
+    ) -> None:
+        """Queue a task for the next run.
+
+        Args:
+            name: Unique name of the task, used to detect fetches still in flight.
+            fetch: Sends the requests, e.g. lambda: self._rpc_call(request). Runs in a
+                worker thread.
+            handle: Updates the metrics from the fetch result. Runs in the thread
+                calling run.
+            priority: CRITICAL, NORMAL, BULK or any other int, lower runs first.
+        """
+        heapq.heappush(
+            self._queue,
+            (priority, self._sequence, CollectionTask(name, fetch, handle, priority)),
+        )
+        self._sequence += 1
+
+    def run(self, budget: Optional[float] = None) -> ScheduleResult:
+        """Dispatch the queued tasks and handle their results until done or out of budget.
+
+        Args:
+            budget: Seconds this run may take, defaults to the scheduler's budget.
+
+        Returns:
+            Names of completed, failed, skipped and pending tasks.
+        """
+        budget = self.budget if budget is None else budget
+        deadline = None if budget is None else time.monotonic() + budget
+        result = ScheduleResult()
+        running: Dict[Future, CollectionTask] = {}
+        # Forget fetches of tasks that are no longer submitted
+        submitted = {task.name for _, _, task in self._queue}
+        for name in list(self._in_flight):
+            if name not in submitted:
+                del self._in_flight[name]
+
+        while self._queue or running:
+            # Fetches occupying the pool of the next task, if it has no thread left
+            blocked: Set[Future] = set()
+            while self._queue and len(running) < self.max_workers:
+                task = self._queue[0][2]
+                if (
+                    task.priority >= BULK
+                    and deadline is not None
+                    and time.monotonic() >= deadline
+                ):
+                    heapq.heappop(self._queue)
+                    result.skipped.append(task.name)
+                    continue
+                blocked = self._occupying(task)
+                if blocked:
+                    break
+                heapq.heappop(self._queue)
+                running[self._dispatch(task)] = task
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(set(running) | blocked, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future in running:
+                    self._handle(running.pop(future), future, result)
+
+        # Out of budget: leave running fetches in flight, start the remaining non-bulk
+        # fetches for the next run to pick up and drop the remaining bulk tasks
+        result.pending = [task.name for task in running.values()]
+        while self._queue:
+            _, _, task = heapq.heappop(self._queue)
+            if task.priority >= BULK:
+                result.skipped.append(task.name)
+            else:
+                self._dispatch(task)
+                result.pending.append(task.name)
+        if self.logger and (result.pending or result.skipped):
+            self.logger.warning(
+                f"Collection budget of {budget}s exhausted, pending: {result.pending}, "
+                f"skipped: {result.skipped}"
+            )
+        return result
+
+    def close(self) -> None:
+        """Release the worker threads once running fetches have finished."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        self._executors = {}
+
+    def _dispatch(self, task: CollectionTask) -> Future:
+        """Start the task's fetch, or reuse the fetch of the same task left in flight.
+
+        A fetch left in flight by an earlier run is reused even if it has finished since,
+        so its result is handled instead of being replaced by a new request.
+        """
+        future = self._in_flight.get(task.name)
+        if future is None:
+            bulk = task.priority >= BULK
+            executor = self._executors.get(bulk)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="rpc-collect-bulk" if bulk else "rpc-collect",
+                )
+                self._executors[bulk] = executor
+            future = executor.submit(task.fetch)
+            self._in_flight[task.name] = future
+            self._started[bulk].add(future)
+        return future
+
+    def _occupying(self, task: CollectionTask) -> Set[Future]:
+        """Return the unfinished fetches of the task's pool if they leave it no thread.
+
+        Fetches left in flight by earlier runs count as well, also those of tasks that
+        are no longer submitted, since they hold a thread until they return.
+        """
+        if task.name in self._in_flight:
+            return set()
+        started = self._started[task.priority >= BULK]
+        started.difference_update([future for future in started if future.done()])
+        return set(started) if len(started) >= self.max_workers else set()
+
+    def _handle(self, task: CollectionTask, future: Future, result: ScheduleResult) -> None:
+        if self._in_flight.get(task.name) is future:
+            del self._in_flight[task.name]
+        # A failing task must not keep the remaining tasks from being published
+        try:
+            task.handle(future.result())
+        except Exception as e:
+            result.failed.append(task.name)
+            if self.logger:
+                self.logger.error(f"Collection task {task.name} failed: {e}")
+            return
+        result.completed.append(task.name)
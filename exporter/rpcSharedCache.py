@@ -0,0 +1,267 @@
+"""Response cache shared by exporter processes on the same host."""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+
+# magic, format version, stored at, expires at
+_HEADER = struct.Struct("<4sBdd")
+_MAGIC = b"RPCC"
+_FORMAT_VERSION = 1
+
+_LEASE_SUFFIX = ".lease"
+_TMP_PREFIX = ".tmp-"
+
+
+def cache_key(rpc_url: str, rpc_requests: List[JsonRPCRequest]) -> str:
+    """Return the entry name of a call, identical across processes for identical calls."""
+    identity = json.dumps(
+        [rpc_url, [[r.method, r.params, r.use_get] for r in rpc_requests]],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def _is_key(name: str) -> bool:
+    return len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+
+
+class SharedResponseCache:
+    """Cache of JSON-RPC responses in a directory shared by several exporter processes.
+
+    HA replicas or exporters of different networks polling the same endpoints with the
+    same requests on one host serve each other's responses instead of each sending them.
+    Every entry is a file holding a header with its expiry and the JSON encoded responses.
+    Entries are replaced atomically, so reads take no lock: a reader memory-maps
+    whichever complete version it opens. On a miss, the process that creates the entry's
+    lease file (O_EXCL) fetches while the others wait for its entry, so a call is sent
+    once per ttl across all processes. A lease older than lease_timeout, e.g. of a
+    process that died while fetching, is broken and the call fetched again. Expired
+    entries as well as abandoned leases and temporary files are swept every
+    sweep_interval seconds, so keys that are never requested again, e.g. per slot, do
+    not accumulate. Only calls whose responses are all successful are cached. Use a tmpfs such as
+    /dev/shm so entries never touch the disk.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        ttl: float,
+        lease_timeout: float = 20.0,
+        poll_interval: float = 0.05,
+        sweep_interval: float = 60.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """Initialize the cache, creating the directory if needed.
+
+        Args:
+            directory: Directory shared by the processes, e.g. /dev/shm/rpc-exporter.
+            ttl: Seconds an entry is served after it was stored.
+            lease_timeout: Seconds after which a lease is considered abandoned; should
+                exceed the slowest expected call.
+            poll_interval: Seconds between checks while waiting for another process.
+            sweep_interval: Seconds between removals of expired entries.
+            logger: Logger used to report unusable entries and failed writes.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self.logger = logger
+        self._leases: Dict[str, str] = {}
+        self._last_sweep = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[List[JsonRPCResponse]]:
+        """Return the entry's responses, None if it is missing, expired or unusable."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, _, expires_at = _HEADER.unpack_from(mm)
+                if (magic, version) != (_MAGIC, _FORMAT_VERSION):
+                    raise ValueError("incompatible cache entry format")
+                if expires_at <= time.time():
+                    return None
+                encoded = json.loads(mm[_HEADER.size :])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            if self.logger:
+                self.logger.warning(f"Ignoring unusable cache entry {path}: {e}")
+            return None
+        return [JsonRPCResponse(result=result, error=error) for result, error in encoded]
+
+    def put(self, key: str, responses: List[JsonRPCResponse]) -> bool:
+        """Atomically store responses under the key.
+
+        Returns:
+            True if the entry was written.
+        """
+        now = time.time()
+        payload = (
+            _HEADER.pack(_MAGIC, _FORMAT_VERSION, now, now + self.ttl)
+            + json.dumps([[response.result, response.error] for response in responses]).encode()
+        )
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=_TMP_PREFIX)
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if self.logger:
+                self.logger.error(f"Failed to write cache entry {key}: {e}")
+            return False
+        return True
+
+    def sweep(self) -> int:
+        """Remove expired entries, abandoned leases and leftover temporary files.
+
+        Returns:
+            Number of removed files.
+        """
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f"Failed to sweep cache directory {self.directory}: {e}")
+            return 0
+        for name in names:
+            key = name[: -len(_LEASE_SUFFIX)] if name.endswith(_LEASE_SUFFIX) else name
+            if not name.startswith(_TMP_PREFIX) and not _is_key(key):
+                # Leave files that are not part of the cache alone
+                continue
+            path = self._path(name)
+            try:
+                if name.startswith(_TMP_PREFIX) or name.endswith(_LEASE_SUFFIX):
+                    if now - os.stat(path).st_mtime < self.lease_timeout:
+                        continue
+                elif not self._is_expired(path, now):
+                    continue
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"Failed to remove cache file {path}: {e}")
+        return removed
+
+    @staticmethod
+    def _is_expired(path: str, now: float) -> bool:
+        """Check whether the entry at path is expired and was not replaced since."""
+        with open(path, "rb") as f:
+            try:
+                expires_at = _HEADER.unpack(f.read(_HEADER.size))[3]
+            except struct.error:
+                expires_at = 0.0
+            # A concurrent put replaces the file; leave the fresh entry in place
+            return expires_at <= now and os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = time.monotonic()
+            self.sweep()
+
+    def _acquire_lease(self, key: str) -> bool:
+        """Create the key's lease file, breaking it first if it has been abandoned.
+
+        The lease file holds a token identifying this holder, so that a lease broken as
+        abandoned and taken by another process is not released by this one.
+        """
+        lease_path = self._path(key) + _LEASE_SUFFIX
+        for _ in range(2):
+            try:
+                fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                try:
+                    age = time.time() - os.stat(lease_path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if age < self.lease_timeout:
+                    return False
+                try:
+                    os.unlink(lease_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            token = f"{os.getpid()}-{uuid.uuid4().hex}"
+            with os.fdopen(fd, "w") as lease:
+                lease.write(token)
+            self._leases[key] = token
+            return True
+        return False
+
+    def _release_lease(self, key: str) -> None:
+        """Remove the key's lease file if it still holds this holder's token."""
+        token = self._leases.pop(key, None)
+        lease_path = self._path(key) + _LEASE_SUFFIX
+        try:
+            with open(lease_path) as lease:
+                if lease.read() != token:
+                    return
+            os.unlink(lease_path)
+        except FileNotFoundError:
+            pass
+
+    def get_or_fetch(
+        self,
+        rpc_url: str,
+        rpc_requests: List[JsonRPCRequest],
+        fetch: Callable[[], List[JsonRPCResponse]],
+    ) -> List[JsonRPCResponse]:
+        """Serve a call from the cache or fetch it, at most once per ttl across processes.
+
+        Args:
+            rpc_url: Endpoint the requests are sent to, part of the key.
+            rpc_requests: Requests of the call, part of the key.
+            fetch: Sends the requests when no process has a fresh entry.
+
+        Returns:
+            The cached or fetched responses.
+        """
+        self._maybe_sweep()
+        key = cache_key(rpc_url, rpc_requests)
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            if self._acquire_lease(key):
+                break
+            if time.monotonic() >= deadline:
+                # The lease holder is stuck without being old enough to break, fetch anyway
+                return fetch()
+            time.sleep(self.poll_interval)
+
+        try:
+            # Another process may have stored the entry between the miss and the lease
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            responses = fetch()
+            if responses and all(response.is_successful() for response in responses):
+                self.put(key, responses)
+            return responses
+        finally:
+            self._release_lease(key)
@@ -0,0 +1,168 @@
+"""On-disk snapshot of exported metrics and cached responses for warm restarts."""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from prometheus_client import CollectorRegistry
+from prometheus_client.metrics_core import GaugeMetricFamily, Metric
+
+# magic, format version, written at
+_HEADER = struct.Struct("<4sBd")
+_MAGIC = b"RPCX"
+_FORMAT_VERSION = 2
+
+SNAPSHOT_AGE_METRIC = "rpc_exporter_snapshot_age_seconds"
+
+
+def encode_families(families: Iterable[Metric]) -> List[tuple]:
+    """Convert metric families into plain tuples that marshal and json can serialize."""
+    return [
+        (
+            family.name,
+            family.documentation,
+            family.type,
+            family.unit,
+            [(sample.name, sample.labels, sample.value) for sample in family.samples],
+        )
+        for family in families
+    ]
+
+
+def decode_families(encoded: Iterable[tuple]) -> List[Metric]:
+    """Rebuild metric families from the output of encode_families."""
+    families = []
+    for name, documentation, typ, unit, samples in encoded:
+        family = Metric(name, documentation, typ, unit)
+        for sample_name, labels, value in samples:
+            family.add_sample(sample_name, labels, value)
+        families.append(family)
+    return families
+
+
+class StateSnapshot:
+    """Atomically written snapshot file holding metric samples and cached responses.
+
+    The file is a fixed header followed by a JSON payload. It is replaced atomically
+    on write and memory-mapped on load, so a crash mid-write never leaves a torn file.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None) -> None:
+        """Initialize the snapshot.
+
+        Args:
+            path: Location of the snapshot file.
+            logger: Logger used to report unreadable or unwritable snapshots.
+        """
+        self.path = path
+        self.logger = logger
+
+    def write(self, families: Iterable[Metric], cache_state: Dict[str, Any]) -> bool:
+        """Write metric families and cache state, replacing the previous snapshot.
+
+        Returns:
+            True if the snapshot was written.
+        """
+        try:
+            payload = json.dumps([encode_families(families), cache_state]).encode()
+        except (TypeError, ValueError) as e:
+            if self.logger:
+                self.logger.error(f"Failed to serialize snapshot: {e}")
+            return False
+
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, time.time())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                dir=directory, prefix=".snapshot-", delete=False
+            ) as tmp:
+                tmp_path = tmp.name
+                tmp.write(header)
+                tmp.write(payload)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if self.logger:
+                self.logger.error(f"Failed to write snapshot {self.path}: {e}")
+            return False
+        return True
+
+    def load(self) -> Optional[Tuple[float, List[Metric], Dict[str, Any]]]:
+        """Load the snapshot.
+
+        Returns:
+            Tuple of write time, metric families and cache state, or None if there is no
+            usable snapshot.
+        """
+        try:
+            with (
+                open(self.path, "rb") as f,
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+            ):
+                magic, version, written_at = _HEADER.unpack_from(mm)
+                if (magic, version) != (_MAGIC, _FORMAT_VERSION):
+                    raise ValueError("incompatible snapshot format")
+                encoded, cache_state = json.loads(mm[_HEADER.size :])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError, struct.error) as e:
+            if self.logger:
+                self.logger.warning(f"Ignoring unusable snapshot {self.path}: {e}")
+            return None
+        return written_at, decode_families(encoded), cache_state
+
+
+class WarmStartRegistry:
+    """Registry view serving snapshot samples until the first live collection completes.
+
+    While the snapshot is served, a gauge with its age marks the samples as stale.
+    Pass an instance to start_http_server in place of the live registry.
+    """
+
+    def __init__(
+        self, registry: CollectorRegistry, families: List[Metric], written_at: float
+    ) -> None:
+        """Initialize the view.
+
+        Args:
+            registry: Live registry served once mark_live has been called.
+            families: Metric families restored from the snapshot.
+            written_at: Unix time at which the snapshot was written.
+        """
+        self.registry = registry
+        self.families = families
+        self.written_at = written_at
+        self.live = False
+
+    def mark_live(self) -> None:
+        """Switch to serving the live registry."""
+        self.live = True
+        self.families = []
+
+    def collect(self) -> Iterator[Metric]:
+        """Yield the snapshot families while warming up, the live ones afterwards."""
+        if self.live:
+            yield from self.registry.collect()
+            return
+        yield from self.families
+        age = GaugeMetricFamily(
+            SNAPSHOT_AGE_METRIC,
+            "Age of the snapshot served until the first collection after a restart.",
+        )
+        age.add_metric([], time.time() - self.written_at)
+        yield age
+
+    def restricted_registry(self, names: Iterable[str]) -> Any:
+        """Restrict the live registry to the given names; snapshots are served whole."""
+        if self.live:
+            return self.registry.restricted_registry(names)
+        return self
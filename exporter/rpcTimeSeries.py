@@ -0,0 +1,203 @@
+"""Bounded in-process history of collected values for derived rate metrics."""
+
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from prometheus_client import Gauge
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class RingBuffer:
+    """Fixed-capacity series of (timestamp, value) samples.
+
+    Timestamps and values live in two preallocated array("d") buffers, i.e. 16 bytes per
+    sample and no per-sample objects. Queries run vectorised over the buffers with numpy
+    when it is installed and fall back to plain Python otherwise.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty buffer holding at most capacity samples."""
+        if capacity < 2:
+            raise ValueError(f"Capacity must be at least 2, got {capacity}")
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored samples."""
+        return self._size
+
+    def append(self, value: float, timestamp: Optional[float] = None) -> None:
+        """Add a sample, overwriting the oldest one when the buffer is full."""
+        self._times[self._next] = time.time() if timestamp is None else timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def samples(
+        self, window: Optional[float] = None
+    ) -> Tuple[Sequence[float], Sequence[float]]:
+        """Return timestamps and values in chronological order.
+
+        Args:
+            window: Only return samples at most this many seconds older than the newest.
+        """
+        start = (self._next - self._size) % self.capacity
+        if start + self._size <= self.capacity:
+            times = self._times[start : start + self._size]
+            values = self._values[start : start + self._size]
+        else:
+            times = self._times[start:] + self._times[: self._next]
+            values = self._values[start:] + self._values[: self._next]
+        if window is not None and times:
+            cutoff = times[-1] - window
+            first = next(i for i, t in enumerate(times) if t >= cutoff)
+            times, values = times[first:], values[first:]
+        return times, values
+
+    def last(self) -> Optional[float]:
+        """Return the newest value, None if empty."""
+        return self._values[self._next - 1] if self._size else None
+
+    def rate(self, window: Optional[float] = None) -> Optional[float]:
+        """Per-second increase between the first and last sample of the window.
+
+        Returns None with fewer than two samples or no elapsed time.
+        """
+        times, values = self.samples(window)
+        if len(times) < 2 or times[-1] == times[0]:
+            return None
+        return (values[-1] - values[0]) / (times[-1] - times[0])
+
+    def derivative(self, window: Optional[float] = None) -> Optional[float]:
+        """Per-second slope of a least squares fit over the window, like PromQL deriv()."""
+        times, values = self.samples(window)
+        if len(times) < 2:
+            return None
+        if np is not None:
+            t = np.frombuffer(times, dtype=np.float64)
+            v = np.frombuffer(values, dtype=np.float64)
+            dt = t - t.mean()
+            denominator = float(np.dot(dt, dt))
+            return float(np.dot(dt, v - v.mean())) / denominator if denominator else None
+        t_mean = sum(times) / len(times)
+        v_mean = sum(values) / len(values)
+        denominator = sum((t - t_mean) ** 2 for t in times)
+        if not denominator:
+            return None
+        return sum((t - t_mean) * (v - v_mean) for t, v in zip(times, values)) / denominator
+
+    def ewma(self, alpha: float, window: Optional[float] = None) -> Optional[float]:
+        """Exponentially weighted moving average of the values, seeded with the first one.
+
+        Args:
+            alpha: Weight of the newest sample, between 0 and 1.
+            window: Only average samples within this many seconds of the newest.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        _, values = self.samples(window)
+        if not values:
+            return None
+        n = len(values)
+        if np is not None:
+            # Closed form of s_i = alpha * x_i + (1 - alpha) * s_(i-1) with s_0 = x_0
+            weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+            weights[0] = (1 - alpha) ** (n - 1)
+            return float(np.dot(weights, np.frombuffer(values, dtype=np.float64)))
+        average = values[0]
+        for value in values[1:]:
+            average = alpha * value + (1 - alpha) * average
+        return average
+
+
+class TimeSeriesStore:
+    """Ring buffers per (name, labels) series with bounded total memory.
+
+    Subclasses of RPCExporter append collected values during collect_metrics and publish
+    rates, derivatives or averages computed over them as gauges. Each series holds at
+    most capacity samples; beyond max_series series, the least recently updated series
+    is evicted.
+    """
+
+    def __init__(self, capacity: int = 360, max_series: int = 10000) -> None:
+        """Initialize the store.
+
+        Args:
+            capacity: Samples kept per series, e.g. 360 cycles of history.
+            max_series: Maximum number of series kept.
+        """
+        self.capacity = capacity
+        self.max_series = max_series
+        self._series: "OrderedDict[Tuple[str, LabelKey], RingBuffer]" = OrderedDict()
+
+    @staticmethod
+    def _key(name: str, labels: Optional[Dict[str, str]]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def append(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Append a value to the series, creating it if needed."""
+        key = self._key(name, labels)
+        buffer = self._series.get(key)
+        if buffer is None:
+            buffer = RingBuffer(self.capacity)
+            self._series[key] = buffer
+            if len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+        else:
+            self._series.move_to_end(key)
+        buffer.append(value, timestamp)
+
+    def get(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[RingBuffer]:
+        """Return the buffer of a series, None if unknown."""
+        return self._series.get(self._key(name, labels))
+
+    def discard(self, name: str, labels: Optional[Dict[str, str]] = None) -> None:
+        """Forget a series, e.g. of a validator that left the active set."""
+        self._series.pop(self._key(name, labels), None)
+
+    def series(self, name: str) -> Iterator[Tuple[Dict[str, str], RingBuffer]]:
+        """Iterate over the labels and buffers of all series with the given name."""
+        for (series_name, labels), buffer in list(self._series.items()):
+            if series_name == name:
+                yield dict(labels), buffer
+
+    def publish(
+        self, gauge: Gauge, name: str, query: Callable[[RingBuffer], Optional[float]]
+    ) -> int:
+        """Set a gauge to a query result for every series with the given name.
+
+        Args:
+            gauge: Gauge whose label names match the series labels.
+            name: Series name.
+            query: Computes the value from a buffer, e.g. lambda b: b.rate(window=60).
+                Series for which it returns None are skipped.
+
+        Returns:
+            Number of published values.
+        """
+        published = 0
+        for labels, buffer in self.series(name):
+            value = query(buffer)
+            if value is None:
+                continue
+            target = gauge.labels(**labels) if labels else gauge
+            target.set(value)
+            published += 1
+        return published
@@ -0,0 +1,213 @@
+"""HTTP transports used to reach RPC endpoints."""
+
+import socket
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import quote, unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+TRANSPORTS = ("http1", "http2", "h2c")
+
+UNIX_SCHEME = "http+unix://"
+
+
+def normalize_url(url: str) -> str:
+    """Rewrite unix:// URLs into the http+unix:// form understood by UnixSocketAdapter.
+
+    unix:///var/run/node.sock addresses the path / of the server listening on the socket
+    /var/run/node.sock. Other paths need the http+unix form with the socket path
+    percent-encoded as host, e.g. http+unix://%2Fvar%2Frun%2Fnode.sock/rpc/v1.
+    """
+    if url.startswith("unix://"):
+        return UNIX_SCHEME + quote(url[len("unix://") :], safe="")
+    return url
+
+
+def is_unix_url(url: str) -> bool:
+    """Check whether the URL addresses a Unix domain socket."""
+    return url.startswith((UNIX_SCHEME, "unix://"))
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, **kwargs: Any) -> None:
+        super().__init__("localhost", **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if isinstance(self.timeout, (int, float)) else None)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixHTTPConnectionPool(HTTPConnectionPool):
+    """Connection pool handing out connections to one Unix domain socket."""
+
+    def __init__(self, socket_path: str, **kwargs: Any) -> None:
+        super().__init__("localhost", **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> _UnixHTTPConnection:
+        return _UnixHTTPConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """requests adapter sending http+unix:// URLs over Unix domain sockets.
+
+    Co-located nodes or local JSON-RPC proxies can be reached without loopback TCP.
+    Connections are pooled per socket like HTTPAdapter pools them per host.
+    """
+
+    def __init__(self, pool_maxsize: int = 10) -> None:
+        """Initialize the adapter with pool_maxsize connections per socket."""
+        super().__init__(pool_maxsize=pool_maxsize)
+        self._unix_pools: Dict[str, _UnixHTTPConnectionPool] = {}
+        self._unix_lock = threading.Lock()
+
+    def _unix_pool(self, url: str) -> _UnixHTTPConnectionPool:
+        socket_path = unquote(urlparse(url).netloc)
+        with self._unix_lock:
+            pool = self._unix_pools.get(socket_path)
+            if pool is None:
+                pool = _UnixHTTPConnectionPool(socket_path, maxsize=self._pool_maxsize)
+                self._unix_pools[socket_path] = pool
+            return pool
+
+    def get_connection_with_tls_context(
+        self, request: Any, verify: Any, proxies: Any = None, cert: Any = None
+    ) -> _UnixHTTPConnectionPool:
+        """Return the pool for the request's socket (requests >= 2.32)."""
+        return self._unix_pool(request.url)
+
+    def get_connection(self, url: Any, proxies: Any = None) -> _UnixHTTPConnectionPool:
+        """Return the pool for the URL's socket (requests < 2.32)."""
+        return self._unix_pool(url)
+
+    def request_url(self, request: Any, proxies: Any) -> str:
+        """Send only the path, the socket path is not part of the HTTP request line."""
+        return request.path_url
+
+    def close(self) -> None:
+        """Close all pooled socket connections."""
+        with self._unix_lock:
+            for pool in self._unix_pools.values():
+                pool.close()
+            self._unix_pools.clear()
+        super().close()
+
+
+class Http2Response:
+    """Expose an httpx response through the subset of requests.Response used by send."""
+
+    def __init__(self, response: Any) -> None:
+        """Wrap an httpx.Response."""
+        self._response = response
+        self.status_code: int = response.status_code
+        self.reason: str = response.reason_phrase
+        self.headers = response.headers
+        self.http_version: str = response.http_version
+
+    def json(self) -> Any:
+        """Decode the JSON body, raising requests.RequestException if it is not JSON."""
+        try:
+            return self._response.json()
+        except ValueError as e:
+            # Surface like requests' JSONDecodeError so send reports it per request
+            raise requests.RequestException(f"Failed to decode response: {e}") from e
+
+    def close(self) -> None:
+        """Release the stream; the body has already been read."""
+        self._response.close()
+
+
+class Http2Session:
+    """requests.Session look-alike multiplexing all calls over one HTTP/2 connection.
+
+    Concurrent get/post calls from several threads (e.g. AdaptiveBatcher chunks) share a
+    single connection per endpoint instead of opening one socket and TLS session each.
+    Requires the optional httpx[http2] dependency.
+    """
+
+    def __init__(self, prior_knowledge: bool = False, headers: Optional[dict] = None) -> None:
+        """Initialize the session.
+
+        Args:
+            prior_knowledge: Speak HTTP/2 without negotiation, needed for cleartext (h2c)
+                endpoints. Otherwise HTTP/2 is negotiated via TLS ALPN, with a fallback to
+                HTTP/1.1 for servers that do not offer it.
+            headers: Headers sent with every request.
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "The http2 transport requires httpx with HTTP/2 support, "
+                "install it with 'poetry install -E http2'."
+            ) from e
+        self._httpx = httpx
+        self._client = httpx.Client(http1=not prior_knowledge, http2=True, headers=headers)
+
+    def get(self, url: str, **kwargs: Any) -> Http2Response:
+        """Send a GET request."""
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> Http2Response:
+        """Send a POST request."""
+        return self._request("POST", url, **kwargs)
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        stream: bool = False,
+        data: Optional[bytes] = None,
+        **kwargs: Any,
+    ) -> Http2Response:
+        # httpx decodes compressed bodies itself, so stream is not needed here
+        try:
+            response = self._client.request(
+                method, url, timeout=timeout, content=data, **kwargs
+            )
+        except self._httpx.HTTPError as e:
+            # Surface transport errors like requests does so send reports them per request
+            raise requests.ConnectionError(str(e)) from e
+        return Http2Response(response)
+
+    def close(self) -> None:
+        """Close the underlying connections."""
+        self._client.close()
+
+
+def create_session(transport: str = "http1", pool_maxsize: int = 10) -> Any:
+    """Create a session for the given transport.
+
+    Args:
+        transport: "http1" for a pooled requests.Session, which also accepts http+unix://
+            URLs, "http2" for HTTP/2 negotiated via TLS ALPN or "h2c" for cleartext HTTP/2
+            with prior knowledge.
+        pool_maxsize: Number of pooled HTTP/1.1 connections, i.e. concurrent calls.
+
+    Returns:
+        An object providing the get/post/close interface of requests.Session.
+    """
+    if transport == "http1":
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.mount(UNIX_SCHEME, UnixSocketAdapter(pool_maxsize=pool_maxsize))
+        return session
+    if transport in ("http2", "h2c"):
+        return Http2Session(prior_knowledge=transport == "h2c")
+    raise ValueError(f"Unknown transport '{transport}'. Use one of {TRANSPORTS}.")
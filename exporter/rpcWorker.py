@@ -0,0 +1,261 @@
+"""Run metric collection in a worker process and serve its results from the parent."""
+
+import logging
+import marshal
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from prometheus_client.metrics_core import Metric
+
+from exporter.rpcSnapshot import decode_families, encode_families
+
+# Called with the metric families of every finished cycle
+Publish = Callable[[Iterable[Metric]], None]
+
+
+def encode_payload(families: Iterable[Metric]) -> bytes:
+    """Serialize metric families into the compact binary form sent to the parent."""
+    return marshal.dumps(encode_families(families))
+
+
+def decode_payload(payload: bytes) -> List[Metric]:
+    """Rebuild metric families from the output of encode_payload."""
+    # Payloads only come from the pipe to the exporter's own forked worker
+    return decode_families(marshal.loads(payload))  # nosec B302
+
+
+class WorkerRegistry:
+    """Registry view serving the latest samples received from the worker process.
+
+    Payloads are stored as received and only decoded on the first scrape after an update,
+    so the receiving thread does no parsing work. Until the first payload is decoded, the
+    fallback (e.g. a WarmStartRegistry) is served. A payload that cannot be decoded is
+    reported and the last decoded families are served instead.
+    """
+
+    def __init__(
+        self, fallback: Optional[Any] = None, logger: Optional[logging.Logger] = None
+    ) -> None:
+        """Initialize the view with an optional registry served until the first payload."""
+        self.fallback = fallback
+        self.logger = logger
+        self._lock = threading.Lock()
+        # Latest payload not decoded yet
+        self._payload: Optional[bytes] = None
+        self._families: Optional[List[Metric]] = None
+
+    def update(self, payload: bytes) -> None:
+        """Replace the served samples with a new payload."""
+        with self._lock:
+            self._payload = payload
+
+    def collect(self) -> Iterator[Metric]:
+        """Yield the latest families received from the worker."""
+        with self._lock:
+            if self._payload is not None:
+                try:
+                    self._families = decode_payload(self._payload)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Failed to decode collector worker payload: {e}")
+                self._payload = None
+            if self._families is None:
+                families = list(self.fallback.collect()) if self.fallback else []
+            else:
+                families = self._families
+        yield from families
+
+    def restricted_registry(self, names: Iterable[str]) -> "WorkerRegistry":
+        """Serve all samples; name[] filtering is not supported for worker results."""
+        return self
+
+
+def _run_worker(collect_loop: Callable[[Publish], None], conn: Any) -> None:
+    """Entry point of the worker process."""
+    collect_loop(lambda families: conn.send_bytes(encode_payload(families)))
+
+
+def _fork_worker(collect_loop: Callable[[Publish], None], conn: Any) -> Tuple[int, Any]:
+    """Fork a worker process running collect_loop.
+
+    Args:
+        collect_loop: Runs collect cycles forever, calling publish after each cycle.
+        conn: Supervisor's end of the pipe to the serving process, closed in the worker.
+
+    Returns:
+        The worker's pid and the receiving end of a pipe of its own.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            receiver.close()
+            conn.close()
+            _run_worker(collect_loop, sender)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    sender.close()
+    return pid, receiver
+
+
+def _relay(receiver: Any, conn: Any, timeout: float) -> bool:
+    """Forward a payload of the worker to the serving process, waiting up to timeout.
+
+    Returns:
+        False once the worker has closed its pipe.
+    """
+    try:
+        if receiver.poll(timeout):
+            conn.send_bytes(receiver.recv_bytes())
+    except (EOFError, OSError):
+        # Possibly in the middle of a payload, which is dropped
+        return False
+    return True
+
+
+def _supervise_workers(
+    collect_loop: Callable[[Publish], None],
+    conn: Any,
+    logger: Optional[logging.Logger],
+    restart_delay: float,
+) -> None:
+    """Entry point of the supervisor process, keeping a worker running.
+
+    The supervisor is forked before the serving process starts any threads and starts no
+    threads itself, so workers are never forked from a multi-threaded process. Each worker
+    writes to a pipe of its own whose complete payloads the supervisor relays to conn, so
+    a worker killed while writing cannot leave a partial payload in the serving process's
+    pipe. The supervisor stops its worker and exits when terminated or when the serving
+    process is gone.
+    """
+    serving_pid = os.getppid()
+    worker_pid = 0
+
+    def stop(signum: int, frame: Any) -> None:
+        if worker_pid:
+            try:
+                os.kill(worker_pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    while True:
+        worker_pid, receiver = _fork_worker(collect_loop, conn)
+        connected = True
+        with receiver:
+            while True:
+                pid, status = os.waitpid(worker_pid, os.WNOHANG)
+                if pid:
+                    break
+                if os.getppid() != serving_pid:
+                    stop(signal.SIGTERM, None)
+                if connected:
+                    connected = _relay(receiver, conn, 0.5)
+                else:
+                    time.sleep(0.5)
+            # Forward the payloads sent before the worker exited
+            while connected and receiver.poll():
+                connected = _relay(receiver, conn, 0)
+        if logger:
+            logger.error(
+                f"Collector worker exited with code {os.waitstatus_to_exitcode(status)}, "
+                f"restarting in {restart_delay}s"
+            )
+        worker_pid = 0
+        time.sleep(restart_delay)
+
+
+class CollectorWorker:
+    """Run the collection loop in a forked worker process.
+
+    The worker sends the registry samples of every cycle through a pipe; the parent only
+    receives them and renders scrapes, so parsing in collect_metrics no longer competes
+    with the metrics server for the GIL. Workers are forked, so that the exporter
+    instance, which holds locks and sessions that cannot be pickled, does not need to be
+    transferred. They are forked and restarted by a single-threaded supervisor process,
+    itself forked by start before the parent runs any threads, as forking a
+    multi-threaded process can leave locks held in the child.
+    """
+
+    def __init__(
+        self,
+        collect_loop: Callable[[Publish], None],
+        logger: Optional[logging.Logger] = None,
+        fallback: Optional[Any] = None,
+        restart_delay: float = 5.0,
+    ) -> None:
+        """Initialize the worker.
+
+        Args:
+            collect_loop: Runs collect cycles forever, calling publish after each cycle.
+            logger: Logger used to report worker exits.
+            fallback: Registry served until the first cycle has been received.
+            restart_delay: Seconds to wait before restarting an exited worker.
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Collector worker processes require the 'fork' start method.")
+        self._context = multiprocessing.get_context("fork")
+        self.collect_loop = collect_loop
+        self.logger = logger
+        self.restart_delay = restart_delay
+        self.registry = WorkerRegistry(fallback, logger)
+        # The supervisor process forking the workers
+        self.process: Optional[Any] = None
+
+    def start(self) -> None:
+        """Fork the supervisor, which forks the worker, and start receiving results.
+
+        Must be called before the calling process starts any threads.
+        """
+        receiver, sender = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(
+            target=_supervise_workers,
+            args=(self.collect_loop, sender, self.logger, self.restart_delay),
+            name="rpc-collector-supervisor",
+        )
+        self.process.daemon = True
+        self.process.start()
+        sender.close()
+        threading.Thread(
+            target=self._receive, args=(receiver,), name="rpc-collector-receiver", daemon=True
+        ).start()
+
+    def _receive(self, receiver: Any) -> None:
+        with receiver:
+            while True:
+                try:
+                    self.registry.update(receiver.recv_bytes())
+                except (EOFError, OSError):
+                    return
+
+    def stop(self) -> None:
+        """Terminate the supervisor and its worker."""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def supervise(self) -> None:
+        """Wait for the supervisor, which restarts exited workers. Does not return normally.
+
+        Raises:
+            RuntimeError: If the supervisor process exits, as it cannot safely be forked
+                again from the now multi-threaded serving process.
+        """
+        if self.process is None:
+            self.start()
+        exitcode = None
+        if self.process is not None:
+            self.process.join()
+            exitcode = self.process.exitcode
+        raise RuntimeError(f"Collector supervisor exited with code {exitcode}")
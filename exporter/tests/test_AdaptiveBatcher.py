@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import MagicMock
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.rpcBatcher import AdaptiveBatcher
+
+
+def _echo_post(url, json, timeout):
+    """Answer every request of a batch with its own id, in reverse order."""
+    return MagicMock(
+        status_code=200,
+        json=lambda: [{"id": req["id"], "result": req["params"][0]} for req in reversed(json)],
+    )
+
+
+class TestAdaptiveBatcher(unittest.TestCase):
+    def setUp(self):
+        self.requests = [JsonRPCRequest("getBalance", params=[i]) for i in range(25)]
+
+    def tearDown(self):
+        self.batcher.close()
+
+    def test_chunks_reassembled_in_order(self):
+        """Test that chunks are sent separately and the responses keep request order."""
+        self.batcher = AdaptiveBatcher("http://localhost:8899", max_chunk_size=10)
+        self.batcher.session = MagicMock()
+        self.batcher.session.post.side_effect = _echo_post
+
+        responses = self.batcher.send(self.requests)
+
+        self.assertEqual(self.batcher.session.post.call_count, 3)
+        self.assertEqual([r.result for r in responses], list(range(25)))
+
+    def test_rejected_chunk_is_split_and_size_learned(self):
+        """Test that a rejected batch is retried in halves and the chunk size shrinks."""
+        self.batcher = AdaptiveBatcher("http://localhost:8899", max_chunk_size=20)
+        self.batcher.session = MagicMock()
+
+        def post(url, json, timeout):
+            if len(json) > 8:
+                return MagicMock(status_code=413, reason="Payload Too Large")
+            return _echo_post(url, json, timeout)
+
+        self.batcher.session.post.side_effect = post
+
+        responses = self.batcher.send(self.requests)
+
+        self.assertEqual([r.result for r in responses], list(range(25)))
+        self.assertTrue(all(r.is_successful() for r in responses))
+        self.assertLess(self.batcher.chunk_size, 10)
+
+    def test_single_error_object_counts_as_rejection(self):
+        """Test that a single error object answering a whole batch triggers a split."""
+        self.batcher = AdaptiveBatcher("http://localhost:8899", max_chunk_size=4)
+        self.batcher.session = MagicMock()
+
+        def post(url, json, timeout):
+            if len(json) > 2:
+                return MagicMock(
+                    status_code=200,
+                    json=lambda: {"error": {"code": -32005, "message": "batch too large"}},
+                )
+            return _echo_post(url, json, timeout)
+
+        self.batcher.session.post.side_effect = post
+
+        responses = self.batcher.send(self.requests[:4])
+
+        self.assertEqual([r.result for r in responses], [0, 1, 2, 3])
+        self.assertLess(self.batcher.chunk_size, 4)
+
+    def test_transient_errors_do_not_shrink_chunk_size(self):
+        """Test that errors unrelated to the batch size are reported, not learned."""
+        self.batcher = AdaptiveBatcher("http://localhost:8899", max_chunk_size=4)
+        self.batcher.session = MagicMock()
+        self.batcher.session.post.side_effect = [
+            MagicMock(status_code=400, reason="Bad Request"),
+            MagicMock(
+                status_code=200,
+                json=lambda: {"error": {"code": -32005, "message": "node is behind"}},
+            ),
+        ]
+
+        bad_request = self.batcher.send(self.requests[:4])
+        overloaded = self.batcher.send(self.requests[:4])
+
+        self.assertEqual([r.error["code"] for r in bad_request], [400] * 4)
+        self.assertEqual([r.error["message"] for r in overloaded], ["node is behind"] * 4)
+        self.assertEqual(self.batcher.session.post.call_count, 2)
+        self.assertEqual(self.batcher.chunk_size, 4)
+
+    def test_ceiling_recovers_after_successful_chunks(self):
+        """Test that a size learned from a rejection is not kept for good."""
+        self.batcher = AdaptiveBatcher(
+            "http://localhost:8899", max_chunk_size=10, growth_step=5, ceiling_recovery=3
+        )
+        self.batcher.session = MagicMock()
+        rejections = iter([MagicMock(status_code=413, reason="Payload Too Large")])
+
+        def post(url, json, timeout):
+            if len(json) == 2:
+                return next(rejections, None) or _echo_post(url, json, timeout)
+            return _echo_post(url, json, timeout)
+
+        self.batcher.session.post.side_effect = post
+        self.batcher.chunk_size = 2
+        self.batcher.send(self.requests[:2])
+        self.assertEqual(self.batcher.chunk_size, 1)
+
+        for _ in range(10):
+            responses = self.batcher.send(self.requests)
+        self.assertEqual([r.result for r in responses], list(range(25)))
+        self.assertEqual(self.batcher.chunk_size, 10)
+
+    def test_fast_full_chunks_grow_chunk_size(self):
+        """Test that the chunk size grows back after fast successful chunks."""
+        self.batcher = AdaptiveBatcher(
+            "http://localhost:8899", max_chunk_size=20, growth_step=5
+        )
+        self.batcher.chunk_size = 5
+        self.batcher.session = MagicMock()
+        self.batcher.session.post.side_effect = _echo_post
+
+        self.batcher.send(self.requests[:5])
+
+        self.assertEqual(self.batcher.chunk_size, 10)
+
+    def test_invalid_bounds(self):
+        """Test that inconsistent chunk size bounds are refused."""
+        self.batcher = AdaptiveBatcher("http://localhost:8899")
+        with self.assertRaises(ValueError):
+            AdaptiveBatcher("http://localhost:8899", max_chunk_size=1, min_chunk_size=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
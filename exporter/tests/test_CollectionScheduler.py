@@ -0,0 +1,152 @@
+import threading
+import time
+import unittest
+
+from exporter.rpcScheduler import BULK, CRITICAL, NORMAL, CollectionScheduler
+
+
+class TestCollectionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.handled = []
+        self.scheduler = CollectionScheduler(max_workers=1)
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def _handler(self, name):
+        return lambda result: self.handled.append((name, result))
+
+    def test_dispatched_by_priority(self):
+        """Test that critical tasks run first, in submission order within a priority."""
+        self.scheduler.submit("bulk", lambda: 1, self._handler("bulk"), BULK)
+        self.scheduler.submit("health", lambda: 2, self._handler("health"), CRITICAL)
+        self.scheduler.submit("epoch", lambda: 3, self._handler("epoch"), NORMAL)
+        self.scheduler.submit("slot", lambda: 4, self._handler("slot"), CRITICAL)
+
+        result = self.scheduler.run()
+
+        self.assertEqual(self.handled, [("health", 2), ("slot", 4), ("epoch", 3), ("bulk", 1)])
+        self.assertEqual(result.completed, ["health", "slot", "epoch", "bulk"])
+
+    def test_handled_before_slow_fetches_finish(self):
+        """Test that results are published while other fetches are still running."""
+        scheduler = CollectionScheduler(max_workers=2)
+        release = threading.Event()
+        published = threading.Event()
+        scheduler.submit("bulk", lambda: release.wait(5), lambda _: None, BULK)
+        scheduler.submit("slot", lambda: 42, lambda slot: published.set(), CRITICAL)
+        runner = threading.Thread(target=scheduler.run)
+        runner.start()
+        try:
+            self.assertTrue(published.wait(5))
+            self.assertTrue(runner.is_alive())
+        finally:
+            release.set()
+            runner.join()
+            scheduler.close()
+
+    def test_budget_skips_bulk_and_keeps_fetch_in_flight(self):
+        """Test that a stalled fetch is awaited by the next run instead of being resent."""
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch():
+            calls.append(time.monotonic())
+            release.wait(5)
+            return "accounts"
+
+        self.scheduler.submit("accounts", slow_fetch, self._handler("accounts"), NORMAL)
+        self.scheduler.submit("rewards", lambda: 1, self._handler("rewards"), BULK)
+        result = self.scheduler.run(budget=0.1)
+
+        self.assertEqual(result.pending, ["accounts"])
+        self.assertEqual(result.skipped, ["rewards"])
+        self.assertEqual(self.handled, [])
+
+        self.scheduler.submit("accounts", slow_fetch, self._handler("accounts"), NORMAL)
+        threading.Timer(0.1, release.set).start()
+        result = self.scheduler.run(budget=5)
+
+        self.assertEqual(result.completed, ["accounts"])
+        self.assertEqual(self.handled, [("accounts", "accounts")])
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_finished_between_runs_handled(self):
+        """Test that a stalled fetch finishing before the next run is handled, not resent."""
+        calls = []
+
+        def slow_fetch():
+            calls.append(time.monotonic())
+            time.sleep(0.3)
+            return len(calls)
+
+        # Runs alternately start a fetch and handle its result
+        for _ in range(4):
+            self.scheduler.submit("accounts", slow_fetch, self._handler("accounts"), NORMAL)
+            self.scheduler.run(budget=0.1)
+            time.sleep(0.5)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.handled, [("accounts", 1), ("accounts", 2)])
+
+    def test_in_flight_forgotten_when_not_submitted(self):
+        """Test that fetches of tasks no longer submitted are not kept."""
+        release = threading.Event()
+        self.scheduler.submit("old", lambda: release.wait(5), self._handler("old"), NORMAL)
+        self.scheduler.run(budget=0.05)
+        release.set()
+        self.scheduler.submit("slot", lambda: 1, self._handler("slot"), CRITICAL)
+        self.scheduler.run()
+
+        self.assertEqual(self.scheduler._in_flight, {})
+        self.assertEqual(self.handled, [("slot", 1)])
+
+    def test_critical_not_delayed_by_stalled_bulk_fetches(self):
+        """Test that bulk fetches left in flight do not hold up later critical fetches."""
+        scheduler = CollectionScheduler(max_workers=2, budget=0.2)
+        release = threading.Event()
+        try:
+            for cycle in range(2):
+                scheduler.submit("health", lambda: "ok", self._handler("health"), CRITICAL)
+                scheduler.submit("bulk1", lambda: release.wait(5), self._handler("bulk1"), BULK)
+                scheduler.submit("bulk2", lambda: release.wait(5), self._handler("bulk2"), BULK)
+                result = scheduler.run()
+
+                self.assertEqual(result.completed, ["health"])
+                self.assertEqual(result.pending, ["bulk1", "bulk2"])
+            self.assertEqual(self.handled, [("health", "ok"), ("health", "ok")])
+        finally:
+            release.set()
+            scheduler.close()
+
+    def test_non_bulk_tasks_started_past_budget(self):
+        """Test that only bulk tasks are dropped when the budget is used up."""
+        release = threading.Event()
+        self.scheduler.submit("slow", lambda: release.wait(5), self._handler("slow"), CRITICAL)
+        self.scheduler.submit("health", lambda: "ok", self._handler("health"), CRITICAL)
+        self.scheduler.submit("bulk", lambda: 1, self._handler("bulk"), BULK)
+
+        result = self.scheduler.run(budget=0.1)
+        release.set()
+
+        self.assertEqual(result.pending, ["slow", "health"])
+        self.assertEqual(result.skipped, ["bulk"])
+
+    def test_failures_do_not_stop_other_tasks(self):
+        """Test that failing fetches and handlers are reported and skipped."""
+
+        def fail():
+            raise RuntimeError("node unreachable")
+
+        self.scheduler.submit("broken", fail, self._handler("broken"), CRITICAL)
+        self.scheduler.submit("slot", lambda: 7, self._handler("slot"), NORMAL)
+
+        result = self.scheduler.run()
+
+        self.assertEqual(result.failed, ["broken"])
+        self.assertEqual(result.completed, ["slot"])
+        self.assertEqual(self.handled, [("slot", 7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import signal
+import struct
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import CollectorRegistry, Gauge, generate_latest
+
+from exporter import rpcWorker
+from exporter.rpcExporter import RPCExporter
+from exporter.rpcWorker import (
+    CollectorWorker,
+    WorkerRegistry,
+    decode_payload,
+    encode_payload,
+)
+
+
+class PidExporter(RPCExporter):
+    """Exporter publishing the pid of the process running collect_metrics."""
+
+    def setup_metrics(self):
+        self.pid = Gauge("collector_pid", "Collector process id", registry=self.registry)
+
+    def collect_metrics(self):
+        self.pid.set(os.getpid())
+
+
+class TestCollectorWorker(unittest.TestCase):
+    @patch.dict(
+        "os.environ",
+        {
+            "RPC_URL": "http://localhost:8899",
+            "PUBLIC_RPC_URL": "https://api.testnet.solana.com",
+            "EXPORTER_PORT": "7896",
+            "POLL_INTERVAL": "10",
+        },
+    )
+    def setUp(self):
+        keys = {
+            "rpc_url": "RPC_URL",
+            "public_rpc_url": "PUBLIC_RPC_URL",
+            "exporter_port": "EXPORTER_PORT",
+            "poll_interval": "POLL_INTERVAL",
+        }
+        self.exporter = PidExporter(config_source="fromEnv", config_keys=keys)
+        self.exporter.setup_metrics()
+
+    def test_samples_collected_in_worker_process(self):
+        """Test that samples are collected in a child process and served by the parent."""
+        fallback = CollectorRegistry()
+        Gauge("warming_up", "Served before the first cycle", registry=fallback).set(1)
+        worker = CollectorWorker(self.exporter._collect_loop, fallback=fallback)
+        self.assertIn(b"warming_up 1.0", generate_latest(worker.registry))
+
+        worker.start()
+        try:
+            deadline = time.monotonic() + 10
+            families = []
+            while not families and time.monotonic() < deadline:
+                families = [f for f in worker.registry.collect() if f.name == "collector_pid"]
+                time.sleep(0.05)
+        finally:
+            worker.stop()
+
+        self.assertEqual(len(families), 1)
+        child_pid = families[0].samples[0].value
+        self.assertNotIn(child_pid, (os.getpid(), worker.process.pid))
+
+    def test_exited_worker_restarted_by_supervisor(self):
+        """Test that workers are re-forked by the supervisor, not the serving process."""
+
+        def collect_once(publish):
+            self.exporter.collect_metrics()
+            publish(self.exporter.registry.collect())
+            time.sleep(0.2)
+
+        worker = CollectorWorker(collect_once, restart_delay=0.05)
+        worker.start()
+        pids = set()
+        try:
+            deadline = time.monotonic() + 10
+            while len(pids) < 2 and time.monotonic() < deadline:
+                for family in worker.registry.collect():
+                    pids.add(family.samples[0].value)
+                time.sleep(0.02)
+            self.assertTrue(worker.process.is_alive())
+        finally:
+            worker.stop()
+
+        self.assertEqual(len(pids), 2)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_worker_killed_while_sending_does_not_corrupt_later_payloads(self):
+        """Test that a partial payload of a killed worker is dropped by the supervisor."""
+        run_worker = rpcWorker._run_worker
+        marker = os.path.join(tempfile.mkdtemp(), "killed")
+
+        def killed_while_sending(collect_loop, conn):
+            if os.path.exists(marker):
+                return run_worker(collect_loop, conn)
+            open(marker, "w").close()
+            # Length prefix of a large payload followed by only part of it
+            os.write(conn.fileno(), struct.pack("!i", 1 << 20) + b"partial")
+            os.kill(os.getpid(), signal.SIGKILL)
+
+        worker = CollectorWorker(self.exporter._collect_loop, restart_delay=0.05)
+        with patch.object(rpcWorker, "_run_worker", killed_while_sending):
+            worker.start()
+        try:
+            deadline = time.monotonic() + 10
+            families = []
+            while not families and time.monotonic() < deadline:
+                families = [f for f in worker.registry.collect() if f.name == "collector_pid"]
+                time.sleep(0.05)
+        finally:
+            worker.stop()
+            os.unlink(marker)
+            os.rmdir(os.path.dirname(marker))
+
+        self.assertEqual(len(families), 1)
+
+    def test_undecodable_payload_keeps_last_families(self):
+        """Test that a corrupt payload is reported and the last samples stay served."""
+        self.exporter.collect_metrics()
+        logger = MagicMock()
+        registry = WorkerRegistry(logger=logger)
+        registry.update(encode_payload(self.exporter.registry.collect()))
+        self.assertEqual(len(list(registry.collect())), 1)
+
+        registry.update(b"garbage")
+
+        self.assertIn(f"collector_pid {float(os.getpid())}".encode(), generate_latest(registry))
+        logger.error.assert_called_once()
+
+    def test_payload_round_trip(self):
+        """Test that samples survive the binary encoding and are decoded lazily."""
+        self.exporter.collect_metrics()
+        payload = encode_payload(self.exporter.registry.collect())
+
+        registry = WorkerRegistry()
+        self.assertEqual(list(registry.collect()), [])
+        registry.update(payload)
+
+        self.assertEqual(decode_payload(payload)[0].samples[0].value, os.getpid())
+        self.assertIn(f"collector_pid {float(os.getpid())}".encode(), generate_latest(registry))
+
+
+if __name__ == "__main__":
+    unittest.main()
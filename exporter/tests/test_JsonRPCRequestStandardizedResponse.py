@@ -36,6 +36,17 @@ class TestJsonRPCRequestStandardizeResponse(unittest.TestCase):
         self.assertTrue(responses[1].is_successful())
         self.assertEqual(responses[1].result["height"], 12346)
 
+    def test_standardize_response_reorders_by_id(self):
+        """Test that batch responses answered out of order are matched back by id."""
+        responses = JsonRPCRequest.standardize_response(
+            [
+                {"id": 2, "result": {"height": 12346}},
+                {"id": 1, "result": {"height": 12345}},
+            ]
+        )
+
+        self.assertEqual([r.result["height"] for r in responses], [12345, 12346])
+
     @patch("requests.post")
     def test_standardize_response_serial(self, mock_post):
         """Test serial mode handling with two block requests."""
@@ -0,0 +1,87 @@
+import gzip
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.rpcCompression import CompressionConfig
+
+
+class _GzipJsonRPCHandler(BaseHTTPRequestHandler):
+    """Answer JSON-RPC batches, gzip compressed if the client accepts it."""
+
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.received.append((dict(self.headers), json.loads(body)))
+
+        batch = json.loads(body)
+        payload = json.dumps([{"id": req["id"], "result": req["params"]} for req in batch])
+        payload = payload.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRPCCompression(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _GzipJsonRPCHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _GzipJsonRPCHandler.received.clear()
+        self.requests = [
+            JsonRPCRequest("getBalance", params=[f"account{i}"]) for i in range(50)
+        ]
+
+    def test_gzip_response_streamed_and_large_body_compressed(self):
+        """Test that large bodies are sent gzipped and gzipped responses are decoded."""
+        compression = CompressionConfig(accept_encoding="gzip", request_min_bytes=256)
+        responses = JsonRPCRequest.send(self.url, self.requests, compression=compression)
+
+        headers, batch = _GzipJsonRPCHandler.received[0]
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Accept-Encoding"], "gzip")
+        self.assertEqual(len(batch), 50)
+        self.assertEqual([r.result for r in responses], [[f"account{i}"] for i in range(50)])
+
+    def test_small_body_and_identity_encoding(self):
+        """Test that small bodies stay uncompressed and identity disables compression."""
+        compression = CompressionConfig.from_config("identity", "100000")
+        responses = JsonRPCRequest.send(self.url, self.requests[:2], compression=compression)
+
+        headers, _ = _GzipJsonRPCHandler.received[0]
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(headers["Accept-Encoding"], "identity")
+        self.assertEqual(responses[1].result, ["account1"])
+
+    def test_from_config_drops_unsupported_encodings(self):
+        """Test that codings which cannot be decoded are not advertised."""
+        self.assertEqual(
+            CompressionConfig.from_config("unknown, gzip", None).accept_encoding, "gzip"
+        )
+        with self.assertRaises(ValueError):
+            CompressionConfig.from_config("unknown", None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import json
+import threading
+import time
+import tracemalloc
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.rpcCompression import CompressionConfig
+from exporter.rpcDebug import CollectionProfiler, CycleTimings, start_debug_server
+
+
+def _busy_decode():
+    """Stand-in for a request decoded in a pool thread."""
+    deadline = time.perf_counter() + 0.01
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def _busy_collect(timings, pool):
+    """Stand-in for collect_metrics spending time in an RPC call and in metric updates."""
+    with timings.measure_wall("rpc_calls"):
+        pool.submit(_busy_decode).result()
+    deadline = time.perf_counter() + 0.02
+    values = []
+    while time.perf_counter() < deadline:
+        values.append(sum(range(100)))
+
+
+class TestRPCDebug(unittest.TestCase):
+    def setUp(self):
+        self.timings = CycleTimings()
+        self.profiler = CollectionProfiler(self.timings, interval=0.001)
+        self.server = start_debug_server(0, self.profiler, poll_interval=0.01)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpc-batch")
+        self.stop = threading.Event()
+        self.collector = threading.Thread(target=self._collect_loop, daemon=True)
+        self.collector.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.collector.join()
+        self.pool.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _collect_loop(self):
+        while not self.stop.is_set():
+            with self.profiler.cycle():
+                _busy_collect(self.timings, self.pool)
+            time.sleep(0.005)
+
+    def test_profile_returns_collapsed_stacks(self):
+        """Test that the profile samples the collecting thread over the requested cycles."""
+        response = requests.get(f"{self.url}/debug/profile?cycles=3", timeout=10)
+
+        self.assertEqual(response.status_code, 200)
+        stacks = dict(line.rsplit(" ", 1) for line in response.text.splitlines())
+        collecting = [stack for stack in stacks if "_collect_loop (test_RPCDebug.py)" in stack]
+        self.assertTrue(collecting)
+        self.assertTrue(
+            all(stack.startswith(f"{self.collector.name};") for stack in collecting)
+        )
+        self.assertTrue(all(int(count) > 0 for count in stacks.values()))
+        self.assertTrue(any("_busy_collect" in stack for stack in collecting))
+
+    def test_profile_samples_pool_threads(self):
+        """Test that requests running in pool threads show up under the thread's name."""
+        response = requests.get(f"{self.url}/debug/profile?cycles=5", timeout=10)
+
+        lines = response.text.splitlines()
+        self.assertTrue(any(line.startswith("rpc-batch") for line in lines))
+        self.assertTrue(any("_busy_decode (test_RPCDebug.py)" in line for line in lines))
+        self.assertFalse(any(line.startswith("debug-server") for line in lines))
+
+    def test_timings_breakdown(self):
+        """Test that each cycle reports RPC time separately from metric updates."""
+        time.sleep(0.2)
+        response = requests.get(f"{self.url}/debug/timings?cycles=2", timeout=10)
+
+        history = response.json()
+        self.assertEqual(len(history), 2)
+        self.assertGreaterEqual(history[-1]["rpc_calls"], 0.01)
+        self.assertGreaterEqual(history[-1]["metric_update"], 0.015)
+
+    def test_tracemalloc_diff(self):
+        """Test that tracemalloc is started on demand and diffs consecutive cycles."""
+        first = requests.get(f"{self.url}/debug/tracemalloc", timeout=10).text
+        self.assertIn("started", first)
+
+        time.sleep(0.3)
+        diff = requests.get(f"{self.url}/debug/tracemalloc?top=5", timeout=10).text
+        self.assertLessEqual(len(diff.splitlines()), 5)
+        self.assertNotIn("no diff yet", diff)
+
+        requests.get(f"{self.url}/debug/tracemalloc?stop=1", timeout=10)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_unknown_path_and_bad_parameter(self):
+        self.assertEqual(requests.get(f"{self.url}/debug/nope", timeout=10).status_code, 404)
+        response = requests.get(f"{self.url}/debug/profile?cycles=x", timeout=10)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCollectionProfiler(unittest.TestCase):
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def test_tracemalloc_stopped_during_cycle_end(self):
+        """Test that stopping tracemalloc while a cycle ends does not break the cycle."""
+        profiler = CollectionProfiler(CycleTimings())
+        take_snapshot = tracemalloc.take_snapshot
+        stopper = threading.Thread(target=profiler.stop_tracemalloc)
+
+        def stop_then_snapshot():
+            # A /debug/tracemalloc?stop=1 request arriving between the check and the snapshot
+            stopper.start()
+            stopper.join(0.1)
+            return take_snapshot()
+
+        tracemalloc.start()
+        with patch("exporter.rpcDebug.tracemalloc.take_snapshot", stop_then_snapshot):
+            with profiler.cycle():
+                pass
+        stopper.join()
+
+        self.assertEqual(profiler._completed, 1)
+        self.assertFalse(profiler._running)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestCycleTimings(unittest.TestCase):
+    def test_phases_accumulate_per_cycle(self):
+        timings = CycleTimings(history=2)
+        for _ in range(3):
+            timings.begin_cycle()
+            timings.add("rpc_calls", 0.5)
+            timings.add("decode", 0.1)
+            timings.add("decode", 0.1)
+            entry = timings.end_cycle()
+
+        self.assertEqual(len(timings.history), 2)
+        self.assertEqual(entry["cycle"], 3)
+        self.assertAlmostEqual(entry["decode"], 0.2)
+        self.assertEqual(json.loads(json.dumps(entry))["rpc_calls"], 0.5)
+
+    def test_concurrent_rpc_calls_counted_once(self):
+        """Test that overlapping calls in several threads add up to their wall time."""
+        timings = CycleTimings()
+        timings.begin_cycle()
+
+        def call():
+            with timings.measure_wall("rpc_calls"):
+                time.sleep(0.2)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(0.1)
+        entry = timings.end_cycle()
+
+        self.assertAlmostEqual(entry["rpc_calls"], 0.2, delta=0.08)
+        self.assertGreaterEqual(entry["metric_update"], 0.08)
+
+    @patch("requests.post")
+    def test_send_records_wait_and_decode(self, mock_post):
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"result": 42}
+        timings = CycleTimings()
+        timings.begin_cycle()
+
+        JsonRPCRequest.send("http://localhost:8899", JsonRPCRequest("getSlot"), timings=timings)
+
+        entry = timings.end_cycle()
+        self.assertIn("rpc_wait", entry)
+        self.assertIn("decode", entry)
+
+    def test_streamed_body_recorded_as_transfer(self):
+        """Test that a slowly sent body is not counted as RPC wait or decode time."""
+
+        class DelayedBodyHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                body = b'[{"jsonrpc": "2.0", "id": 1, "result": 42}]'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.flush()
+                time.sleep(0.3)
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), DelayedBodyHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        timings = CycleTimings()
+        timings.begin_cycle()
+        try:
+            responses = JsonRPCRequest.send(
+                f"http://127.0.0.1:{server.server_address[1]}",
+                [JsonRPCRequest("getSlot")],
+                compression=CompressionConfig(),
+                timings=timings,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        entry = timings.end_cycle()
+        self.assertEqual(responses[0].result, 42)
+        self.assertGreaterEqual(entry["transfer"], 0.25)
+        self.assertLess(entry["rpc_wait"], 0.25)
+        self.assertLess(entry["decode"], 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import struct
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+from prometheus_client import CollectorRegistry, Counter, Gauge
+
+from exporter.rpcPush import (
+    PushgatewayPusher,
+    RemoteWritePusher,
+    _snappy_literal_block,
+    create_pusher,
+    encode_write_request,
+)
+
+
+def _snappy_literal_decode(data):
+    """Decode a snappy block consisting of literals only."""
+    length, shift, pos = 0, 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos] >> 2
+        pos += 1
+        if tag < 60:
+            size = tag + 1
+        elif tag == 60:
+            size = data[pos] + 1
+            pos += 1
+        else:
+            size = struct.unpack_from("<H", data, pos)[0] + 1
+            pos += 2
+        out += data[pos : pos + size]
+        pos += size
+    assert len(out) == length
+    return bytes(out)
+
+
+class _RemoteWriteReceiver(BaseHTTPRequestHandler):
+    """Record remote_write requests, answering with the queued status codes."""
+
+    statuses = []
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        status = self.statuses.pop(0) if self.statuses else 204
+        if status < 300:
+            self.received.append((dict(self.headers), body))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRemoteWrite(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _RemoteWriteReceiver)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/api/v1/write"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _RemoteWriteReceiver.statuses.clear()
+        _RemoteWriteReceiver.received.clear()
+        self.registry = CollectorRegistry()
+        Gauge("up", "Node is up", registry=self.registry).set(1)
+        Counter("rpc_errors", "RPC errors", ["method"], registry=self.registry).labels(
+            method="getSlot"
+        ).inc(2)
+
+    def test_encode_write_request(self):
+        """Test the protobuf encoding of a single series against hand-encoded bytes."""
+        label_name = b"\x0a\x08__name__\x12\x02up"
+        label_job = b"\x0a\x03job\x12\x01x"
+        sample = b"\x09" + struct.pack("<d", 1.0) + b"\x10\xe8\x07"
+        timeseries = b"\x0a\x0e" + label_name + b"\x0a\x08" + label_job + b"\x12\x0c" + sample
+
+        encoded = encode_write_request([([("job", "x"), ("__name__", "up")], 1.0, 1000)])
+
+        self.assertEqual(encoded, b"\x0a\x28" + timeseries)
+
+    def test_snappy_literal_block_round_trip(self):
+        for size in (0, 10, 200, 70000):
+            data = bytes(range(256)) * (size // 256) + bytes(size % 256)
+            self.assertEqual(_snappy_literal_decode(_snappy_literal_block(data)), data)
+
+    @patch("exporter.rpcPush.snappy_compress", _snappy_literal_block)
+    def test_push_to_receiver(self):
+        """Test that samples arrive as snappy-compressed protobuf with external labels."""
+        pusher = RemoteWritePusher(self.url, external_labels={"job": "solana"})
+
+        self.assertEqual(pusher.push(self.registry, timestamp_ms=1000), 0)
+
+        headers, body = _RemoteWriteReceiver.received[0]
+        self.assertEqual(headers["Content-Encoding"], "snappy")
+        self.assertEqual(headers["Content-Type"], "application/x-protobuf")
+        self.assertEqual(headers["X-Prometheus-Remote-Write-Version"], "0.1.0")
+        expected = encode_write_request(
+            [
+                ([("job", "solana"), ("__name__", "up")], 1.0, 1000),
+                (
+                    [
+                        ("job", "solana"),
+                        ("method", "getSlot"),
+                        ("__name__", "rpc_errors_total"),
+                    ],
+                    2.0,
+                    1000,
+                ),
+            ]
+        )
+        self.assertEqual(_snappy_literal_decode(body), expected)
+
+    def test_retry_queue(self):
+        """Test that failed batches are retried in order and rejected ones dropped."""
+        pusher = RemoteWritePusher(self.url, max_batch_series=1, logger=MagicMock())
+
+        _RemoteWriteReceiver.statuses.extend([503])
+        self.assertEqual(pusher.push(self.registry), 2)
+        self.assertEqual(_RemoteWriteReceiver.received, [])
+
+        _RemoteWriteReceiver.statuses.extend([204, 400])
+        self.assertEqual(pusher.push(self.registry), 0)
+        self.assertEqual(len(_RemoteWriteReceiver.received), 3)
+        self.assertEqual(pusher.dropped, 1)
+
+    def test_queue_bounded(self):
+        """Test that the oldest batches are dropped when the receiver stays down."""
+        pusher = RemoteWritePusher(self.url, max_batch_series=1, max_queued_batches=3)
+        _RemoteWriteReceiver.statuses.extend([503] * 3)
+
+        pusher.push(self.registry)
+        self.assertEqual(pusher.push(self.registry), 3)
+        self.assertEqual(pusher.dropped, 1)
+
+
+class TestPushgateway(unittest.TestCase):
+    @patch("exporter.rpcPush.push_to_gateway")
+    def test_push(self, mock_push):
+        registry = CollectorRegistry()
+        pusher = create_pusher("pushgateway", "http://localhost:9091", "solana", "node-1")
+
+        self.assertIsInstance(pusher, PushgatewayPusher)
+        self.assertEqual(pusher.push(registry), 0)
+        mock_push.assert_called_once_with(
+            "http://localhost:9091",
+            job="solana",
+            registry=registry,
+            grouping_key={"instance": "node-1"},
+            timeout=10,
+        )
+
+    @patch("exporter.rpcPush.push_to_gateway", side_effect=OSError("refused"))
+    def test_push_failure(self, mock_push):
+        pusher = PushgatewayPusher("http://localhost:9091", "solana", logger=MagicMock())
+        self.assertEqual(pusher.push(CollectorRegistry()), 1)
+        pusher.logger.error.assert_called_once()
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            create_pusher("carrier-pigeon", "http://localhost", "solana")
+
+
+if __name__ == "__main__":
+    unittest.main()
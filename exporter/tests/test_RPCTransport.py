@@ -0,0 +1,228 @@
+import importlib.util
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.rpcBatcher import AdaptiveBatcher
+from exporter.rpcCompression import CompressionConfig
+from exporter.rpcTransport import create_session, normalize_url
+
+HAS_HTTP2 = all(importlib.util.find_spec(name) for name in ("httpx", "h2"))
+
+
+class _H2StandIn:
+    """Minimal cleartext HTTP/2 JSON-RPC server counting connections and streams."""
+
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+        self.connections = 0
+        self.streams = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2.events import DataReceived, RequestReceived, StreamEnded
+
+        conn = H2Connection(config=H2Configuration(client_side=False))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+        headers, bodies = {}, {}
+        with client:
+            while data := client.recv(65535):
+                for event in conn.receive_data(data):
+                    if isinstance(event, RequestReceived):
+                        headers[event.stream_id] = dict(event.headers)
+                        bodies[event.stream_id] = b""
+                    elif isinstance(event, DataReceived):
+                        bodies[event.stream_id] += event.data
+                        conn.acknowledge_received_data(
+                            event.flow_controlled_length, event.stream_id
+                        )
+                    elif isinstance(event, StreamEnded):
+                        self.streams += 1
+                        self._respond(conn, event.stream_id, headers, bodies)
+                client.sendall(conn.data_to_send())
+
+    @staticmethod
+    def _respond(conn, stream_id, headers, bodies):
+        request_headers = headers.pop(stream_id)
+        body = bodies.pop(stream_id)
+        if request_headers[b":method"] == b"POST":
+            result = [{"id": r["id"], "result": r["params"][0]} for r in json.loads(body)]
+        else:
+            result = {"path": request_headers[b":path"].decode()}
+        payload = json.dumps(result).encode()
+        if request_headers[b":path"].startswith(b"/html"):
+            # A load balancer answering with an error page
+            payload = b"<html><body>502 Bad Gateway</body></html>"
+        conn.send_headers(
+            stream_id,
+            [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(payload))),
+            ],
+        )
+        conn.send_data(stream_id, payload, end_stream=True)
+
+
+@unittest.skipUnless(HAS_HTTP2, "httpx[http2] is not installed")
+class TestHttp2Transport(unittest.TestCase):
+    def setUp(self):
+        self.server = _H2StandIn()
+        self.session = create_session("h2c")
+
+    def tearDown(self):
+        self.session.close()
+        self.server.close()
+
+    def test_parallel_chunks_multiplexed_over_one_connection(self):
+        """Test that concurrent batch chunks share a single HTTP/2 connection."""
+        batcher = AdaptiveBatcher(
+            self.server.url, max_chunk_size=5, max_workers=4, session=self.session
+        )
+        requests_list = [JsonRPCRequest("getBalance", params=[i]) for i in range(20)]
+
+        responses = batcher.send(requests_list)
+
+        self.assertEqual([r.result for r in responses], list(range(20)))
+        self.assertEqual(self.server.streams, 4)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_get_request(self):
+        """Test that GET requests work over the HTTP/2 session."""
+        request = JsonRPCRequest("block/height/{height}", params={"height": 1}, use_get=True)
+
+        responses = JsonRPCRequest.send(self.server.url, request, session=self.session)
+
+        self.assertEqual(responses[0].result, {"path": "/block/height/1"})
+
+    def test_non_json_body_reported_per_request(self):
+        """Test that a 200 response that is not JSON is reported as an error response."""
+        request = JsonRPCRequest("html", use_get=True)
+        for compression in (None, CompressionConfig()):
+            with self.subTest(compression=compression):
+                responses = JsonRPCRequest.send(
+                    self.server.url, request, session=self.session, compression=compression
+                )
+                self.assertFalse(responses[0].is_successful())
+                self.assertIn("Failed to decode response", responses[0].error["message"])
+
+    def test_connection_error_reported_per_request(self):
+        """Test that transport errors are reported like requests exceptions."""
+        with socket.create_server(("127.0.0.1", 0)) as unused:
+            url = f"http://127.0.0.1:{unused.getsockname()[1]}"
+
+        responses = JsonRPCRequest.send(url, [JsonRPCRequest("getSlot")], session=self.session)
+
+        self.assertFalse(responses[0].is_successful())
+
+
+class _UnixJsonRPCHandler(BaseHTTPRequestHandler):
+    """Answer JSON-RPC batches and GET requests received over a Unix socket."""
+
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self._reply([{"id": r["id"], "result": [self.path, r["method"]]} for r in batch])
+
+    def do_GET(self):
+        self._reply({"path": self.path})
+
+    def _reply(self, result):
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self):
+        return "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TestUnixSocketTransport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, "node.sock")
+        self.server = _UnixHTTPServer(self.socket_path, _UnixJsonRPCHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_unix_url_without_session(self):
+        """Test that unix:// URLs are sent over the socket without an explicit session."""
+        responses = JsonRPCRequest.send(
+            f"unix://{self.socket_path}",
+            [JsonRPCRequest("getSlot"), JsonRPCRequest("getHealth")],
+        )
+
+        self.assertEqual([r.result for r in responses], [["/", "getSlot"], ["/", "getHealth"]])
+
+    def test_http_unix_url_with_path_and_get(self):
+        """Test that http+unix:// URLs keep their HTTP path, for POST and GET requests."""
+        session = create_session("http1")
+        base_url = normalize_url(f"unix://{self.socket_path}") + "/rpc/v1"
+
+        post = JsonRPCRequest.send(base_url, JsonRPCRequest("getSlot"), session=session)
+        get = JsonRPCRequest.send(
+            base_url,
+            JsonRPCRequest("block/height/{height}", params={"height": 1}, use_get=True),
+            session=session,
+        )
+        session.close()
+
+        self.assertEqual(post[0].result, ["/rpc/v1", "getSlot"])
+        self.assertEqual(get[0].result, {"path": "/rpc/v1/block/height/1"})
+
+    def test_missing_socket_reported_per_request(self):
+        """Test that a missing socket is reported as a failed response."""
+        missing = os.path.join(self.tmpdir.name, "missing.sock")
+
+        responses = JsonRPCRequest.send(f"unix://{missing}", JsonRPCRequest("getSlot"))
+
+        self.assertFalse(responses[0].is_successful())
+
+
+class TestCreateSession(unittest.TestCase):
+    def test_http1_session(self):
+        self.assertIsInstance(create_session("http1"), requests.Session)
+
+    def test_unknown_transport(self):
+        with self.assertRaises(ValueError):
+            create_session("quic")
+
+
+if __name__ == "__main__":
+    unittest.main()
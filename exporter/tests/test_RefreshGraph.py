@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcRefreshGraph import RefreshGraph
+
+
+class TestRefreshGraph(unittest.TestCase):
+    def setUp(self):
+        self.epoch = 100
+        self.fail_leaders = False
+        self.null_epoch = False
+        self.send = MagicMock(side_effect=self._answer)
+        self.graph = RefreshGraph(self.send)
+        self.graph.sentinel(
+            "epoch", JsonRPCRequest("getEpochInfo"), key=lambda result: result["epoch"]
+        )
+        self.graph.derived("leaders", JsonRPCRequest("getLeaderSchedule"), depends_on=["epoch"])
+        self.graph.derived(
+            "validators", JsonRPCRequest("getVoteAccounts"), depends_on=["leaders"]
+        )
+
+    def _answer(self, requests):
+        responses = []
+        for request in requests:
+            if request.method == "getEpochInfo" and self.null_epoch:
+                responses.append(JsonRPCResponse(result=None))
+            elif request.method == "getEpochInfo":
+                responses.append(
+                    JsonRPCResponse(
+                        result={"epoch": self.epoch, "slotIndex": self.send.call_count}
+                    )
+                )
+            elif request.method == "getLeaderSchedule" and self.fail_leaders:
+                responses.append(JsonRPCResponse(error={"code": -32000, "message": "busy"}))
+            else:
+                responses.append(JsonRPCResponse(result=f"{request.method}@{self.epoch}"))
+        return responses
+
+    def test_derived_fetched_once_until_sentinel_changes(self):
+        """Test that derived requests are only re-fetched when the epoch changes."""
+        self.assertEqual(self.graph.refresh(), ["epoch", "leaders", "validators"])
+        self.assertEqual(self.graph.refresh(), ["epoch"])
+        self.assertEqual(self.graph.result("leaders"), "getLeaderSchedule@100")
+
+        self.epoch = 101
+        self.assertEqual(self.graph.refresh(), ["epoch", "leaders", "validators"])
+        self.assertEqual(self.graph.result("validators"), "getVoteAccounts@101")
+
+    def test_failed_derived_serves_last_result_and_retries(self):
+        """Test that a failed refresh keeps the last result and is retried next time."""
+        self.graph.refresh()
+        self.epoch = 101
+        self.fail_leaders = True
+
+        self.assertEqual(self.graph.refresh(), ["epoch", "leaders"])
+        self.assertEqual(self.graph.result("leaders"), "getLeaderSchedule@100")
+
+        self.fail_leaders = False
+        self.assertEqual(self.graph.refresh(), ["epoch", "leaders", "validators"])
+        self.assertEqual(self.graph.result("leaders"), "getLeaderSchedule@101")
+
+    def test_malformed_result_keeps_last_result(self):
+        """Test that a result the key cannot be extracted from is treated as a failure."""
+        self.graph.sentinel("version", JsonRPCRequest("getVersion"))
+        self.graph.refresh()
+        previous = self.graph.result("epoch")
+        self.null_epoch = True
+        self.epoch = 101
+
+        self.assertEqual(self.graph.refresh(), ["epoch", "version"])
+        self.assertEqual(self.graph.result("epoch"), previous)
+        self.assertEqual(self.graph.result("version"), "getVersion@101")
+        self.assertEqual(self.graph.result("leaders"), "getLeaderSchedule@100")
+
+        self.null_epoch = False
+        self.assertEqual(self.graph.refresh(), ["epoch", "version", "leaders", "validators"])
+
+    def test_malformed_derived_result_retried(self):
+        """Test that a derived request whose key fails stays pending."""
+        graph = RefreshGraph(self.send)
+        graph.sentinel("epoch", JsonRPCRequest("getEpochInfo"), key=lambda r: r["epoch"])
+        graph.derived(
+            "leaders",
+            JsonRPCRequest("getLeaderSchedule"),
+            depends_on=["epoch"],
+            key=lambda result: result["missing"],
+        )
+
+        self.assertEqual(graph.refresh(), ["epoch", "leaders"])
+        self.assertIsNone(graph.get("leaders"))
+        self.assertEqual(graph.refresh(), ["epoch", "leaders"])
+
+    def test_invalid_registrations(self):
+        """Test that unknown dependencies and duplicate names are refused."""
+        with self.assertRaises(ValueError):
+            self.graph.derived("blocks", JsonRPCRequest("getBlocks"), depends_on=["slot"])
+        with self.assertRaises(ValueError):
+            self.graph.sentinel("epoch", JsonRPCRequest("getEpochInfo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
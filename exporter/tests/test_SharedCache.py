@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcExporter import RPCExporter
+from exporter.rpcSharedCache import SharedResponseCache, cache_key
+
+RPC_URL = "http://localhost:8899"
+
+
+def _fetch_in_process(directory, counter_path, barrier):
+    """Fetch getSlot through a cache of its own, counting sends in counter_path."""
+    cache = SharedResponseCache(directory, ttl=10, poll_interval=0.01)
+
+    def fetch():
+        with open(counter_path, "a") as f:
+            f.write("x")
+        time.sleep(0.3)
+        return [JsonRPCResponse(result=os.getpid())]
+
+    barrier.wait()
+    responses = cache.get_or_fetch(RPC_URL, [JsonRPCRequest("getSlot")], fetch)
+    with open(counter_path + ".results", "a") as f:
+        f.write(f"{responses[0].result}\n")
+
+
+class TestSharedResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = SharedResponseCache(self.tmpdir.name, ttl=10, poll_interval=0.01)
+        self.requests = [JsonRPCRequest("getSlot"), JsonRPCRequest("getEpochInfo", [])]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_identifies_call(self):
+        """Test that identical calls share a key and differing calls do not."""
+        key = cache_key(RPC_URL, self.requests)
+        same = [JsonRPCRequest("getSlot"), JsonRPCRequest("getEpochInfo", [])]
+        self.assertEqual(cache_key(RPC_URL, same), key)
+        self.assertNotEqual(cache_key("http://other:8899", same), key)
+        self.assertNotEqual(cache_key(RPC_URL, list(reversed(same))), key)
+
+    def test_served_until_expired(self):
+        """Test that fetched responses are served from the cache for the ttl."""
+        fetch = MagicMock(return_value=[JsonRPCResponse(result=1), JsonRPCResponse(result=2)])
+        first = self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+        second = self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+
+        self.assertEqual(first, second)
+        self.assertEqual(fetch.call_count, 1)
+
+        with patch("exporter.rpcSharedCache.time.time", return_value=time.time() + 11):
+            self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_errors_not_cached(self):
+        """Test that calls with an error response are fetched again."""
+        fetch = MagicMock(
+            return_value=[JsonRPCResponse(result=1), JsonRPCResponse(error={"code": -32000})]
+        )
+        self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+        self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_unusable_entry_ignored(self):
+        """Test that a corrupt entry is treated as a miss."""
+        key = cache_key(RPC_URL, self.requests)
+        with open(os.path.join(self.tmpdir.name, key), "wb") as f:
+            f.write(b"garbage")
+        self.assertIsNone(self.cache.get(key))
+
+    def test_abandoned_lease_broken(self):
+        """Test that a lease older than lease_timeout does not block fetching."""
+        key = cache_key(RPC_URL, self.requests)
+        lease = os.path.join(self.tmpdir.name, key + ".lease")
+        open(lease, "w").close()
+        os.utime(lease, (time.time() - 60, time.time() - 60))
+
+        responses = self.cache.get_or_fetch(
+            RPC_URL, self.requests, lambda: [JsonRPCResponse(result=3)]
+        )
+
+        self.assertEqual(responses[0].result, 3)
+        self.assertFalse(os.path.exists(lease))
+
+    def test_expired_entries_swept(self):
+        """Test that entries of keys never requested again do not accumulate."""
+        cache = SharedResponseCache(self.tmpdir.name, ttl=0.01, sweep_interval=0)
+        for slot in range(50):
+            cache.get_or_fetch(
+                RPC_URL,
+                [JsonRPCRequest("getBlock", [slot])],
+                lambda: [JsonRPCResponse(result=1)],
+            )
+        stale_tmp = os.path.join(self.tmpdir.name, ".tmp-leftover")
+        unrelated = os.path.join(self.tmpdir.name, "unrelated")
+        for path in (stale_tmp, unrelated):
+            open(path, "w").close()
+            os.utime(path, (time.time() - 60, time.time() - 60))
+        time.sleep(0.02)
+
+        cache.get_or_fetch(RPC_URL, self.requests, lambda: [JsonRPCResponse(result=2)])
+
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir.name)),
+            sorted([cache_key(RPC_URL, self.requests), "unrelated"]),
+        )
+
+    def test_release_keeps_lease_taken_over_by_other_process(self):
+        """Test that a holder whose lease was broken does not remove the new holder's lease."""
+        key = cache_key(RPC_URL, self.requests)
+        lease = os.path.join(self.tmpdir.name, key + ".lease")
+
+        def fetch():
+            # Another process breaks the lease as abandoned and takes it over
+            os.unlink(lease)
+            with open(lease, "w") as f:
+                f.write("other-holder")
+            return [JsonRPCResponse(result=4)]
+
+        self.cache.get_or_fetch(RPC_URL, self.requests, fetch)
+
+        with open(lease) as f:
+            self.assertEqual(f.read(), "other-holder")
+
+    def test_single_flight_across_processes(self):
+        """Test that concurrent processes send a call once and share its responses."""
+        context = multiprocessing.get_context("fork")
+        counter = os.path.join(self.tmpdir.name, "sends")
+        barrier = context.Barrier(3)
+        processes = [
+            context.Process(target=_fetch_in_process, args=(self.tmpdir.name, counter, barrier))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+
+        with open(counter) as f:
+            self.assertEqual(f.read(), "x")
+        with open(counter + ".results") as f:
+            self.assertEqual(len(set(f.read().split())), 1)
+
+
+class TestExporterSharedCache(unittest.TestCase):
+    @patch("exporter.jsonRPCRequest.JsonRPCRequest.send")
+    def test_rpc_calls_shared_between_exporters(self, mock_send):
+        mock_send.return_value = [JsonRPCResponse(result=42)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {
+                "RPC_URL": RPC_URL,
+                "PUBLIC_RPC_URL": "https://api.testnet.solana.com",
+                "EXPORTER_PORT": "7896",
+                "POLL_INTERVAL": "10",
+                "SHARED_CACHE_DIR": tmpdir,
+            }
+            keys = {key.lower(): key for key in env}
+            with patch.dict("os.environ", env):
+                first = RPCExporter(config_source="fromEnv", config_keys=keys)
+                second = RPCExporter(config_source="fromEnv", config_keys=keys)
+
+            self.assertEqual(first._rpc_call(JsonRPCRequest("getSlot"))[0].result, 42)
+            self.assertEqual(second._rpc_call(JsonRPCRequest("getSlot"))[0].result, 42)
+            self.assertEqual(second._public_rpc_call(JsonRPCRequest("getSlot"))[0].result, 42)
+
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(
+            [call.kwargs["rpc_url"] for call in mock_send.call_args_list],
+            [RPC_URL, "https://api.testnet.solana.com"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, generate_latest
+
+from exporter.jsonRPCRequest import JsonRPCRequest
+from exporter.jsonRPCResponse import JsonRPCResponse
+from exporter.rpcRefreshGraph import RefreshGraph
+from exporter.rpcSnapshot import SNAPSHOT_AGE_METRIC, StateSnapshot, WarmStartRegistry
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.snap")
+        self.registry = CollectorRegistry()
+        slot = Gauge("solana_slot", "Current slot", ["label"], registry=self.registry)
+        slot.labels(label="test").set(12345)
+        Counter("rpc_errors", "RPC errors", registry=self.registry).inc(3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_serves_snapshot_until_live(self):
+        """Test that restored samples are served, marked stale, until marked live."""
+        snapshot = StateSnapshot(self.path)
+        self.assertTrue(snapshot.write(self.registry.collect(), {"epoch": {"result": 7}}))
+
+        written_at, families, cache_state = snapshot.load()
+        self.assertEqual(cache_state, {"epoch": {"result": 7}})
+
+        view = WarmStartRegistry(CollectorRegistry(), families, written_at)
+        output = generate_latest(view).decode()
+        self.assertIn('solana_slot{label="test"} 12345.0', output)
+        self.assertIn("rpc_errors_total 3.0", output)
+        self.assertIn(SNAPSHOT_AGE_METRIC, output)
+
+        view.mark_live()
+        self.assertEqual(generate_latest(view), b"")
+
+    def test_missing_or_corrupt_snapshot(self):
+        """Test that a missing or corrupt file is ignored."""
+        snapshot = StateSnapshot(self.path, logger=MagicMock())
+        self.assertIsNone(snapshot.load())
+
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot")
+        self.assertIsNone(snapshot.load())
+        snapshot.logger.warning.assert_called_once()
+
+    def test_refresh_graph_state_skips_refetch(self):
+        """Test that restored derived results are not re-fetched while the epoch is unchanged."""
+
+        def answer(requests):
+            return [JsonRPCResponse(result={"epoch": 7}) for _ in requests]
+
+        graph = RefreshGraph(MagicMock(side_effect=answer))
+        graph.sentinel("epoch", JsonRPCRequest("getEpochInfo"), key=lambda r: r["epoch"])
+        graph.derived("leaders", JsonRPCRequest("getLeaderSchedule"), depends_on=["epoch"])
+        graph.refresh()
+        StateSnapshot(self.path).write([], graph.export_state())
+
+        restarted = RefreshGraph(MagicMock(side_effect=answer))
+        restarted.sentinel("epoch", JsonRPCRequest("getEpochInfo"), key=lambda r: r["epoch"])
+        restarted.derived("leaders", JsonRPCRequest("getLeaderSchedule"), depends_on=["epoch"])
+        restarted.load_state(StateSnapshot(self.path).load()[2])
+
+        self.assertEqual(restarted.refresh(), ["epoch"])
+        self.assertEqual(restarted.result("leaders"), {"epoch": 7})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+
+from prometheus_client import CollectorRegistry, Gauge
+
+from exporter import rpcTimeSeries
+from exporter.rpcTimeSeries import RingBuffer, TimeSeriesStore
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps_around_in_order(self):
+        """Test that the oldest samples are overwritten once the buffer is full."""
+        buffer = RingBuffer(4)
+        for i in range(6):
+            buffer.append(i * 10, timestamp=float(i))
+        times, values = buffer.samples()
+        self.assertEqual(list(times), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(values), [20, 30, 40, 50])
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.last(), 50)
+
+    def test_window(self):
+        """Test that queries only consider samples inside the window."""
+        buffer = RingBuffer(10)
+        for t, value in [(0, 0), (10, 100), (20, 110), (30, 120)]:
+            buffer.append(value, timestamp=t)
+        self.assertEqual(list(buffer.samples(window=10)[1]), [110, 120])
+        self.assertAlmostEqual(buffer.rate(), 4.0)
+        self.assertAlmostEqual(buffer.rate(window=20), 1.0)
+
+    def test_empty_and_single_sample(self):
+        """Test that queries without enough samples return None."""
+        buffer = RingBuffer(3)
+        self.assertIsNone(buffer.last())
+        self.assertIsNone(buffer.ewma(0.5))
+        buffer.append(1, timestamp=5)
+        self.assertIsNone(buffer.rate())
+        self.assertIsNone(buffer.derivative())
+        self.assertEqual(buffer.ewma(0.5), 1)
+
+    def test_invalid_arguments(self):
+        """Test that too small capacities and invalid alphas are rejected."""
+        with self.assertRaises(ValueError):
+            RingBuffer(1)
+        with self.assertRaises(ValueError):
+            RingBuffer(2).ewma(0)
+
+    def _check_queries(self):
+        buffer = RingBuffer(8)
+        # Wrap around so the queries run on the concatenated halves
+        for t in range(11):
+            buffer.append(3 * t + (1 if t % 2 else -1), timestamp=float(t))
+        self.assertAlmostEqual(buffer.derivative(), 3.0, delta=0.1)
+        self.assertAlmostEqual(buffer.rate(window=2), 3.0)
+        expected = None
+        for value in buffer.samples()[1]:
+            expected = value if expected is None else 0.3 * value + 0.7 * expected
+        self.assertAlmostEqual(buffer.ewma(0.3), expected)
+
+    def test_queries_pure_python(self):
+        """Test rate, derivative and EWMA without numpy."""
+        with patch.object(rpcTimeSeries, "np", None):
+            self._check_queries()
+
+    @unittest.skipIf(rpcTimeSeries.np is None, "numpy is not installed")
+    def test_queries_numpy(self):
+        """Test that the vectorised queries match the pure Python results."""
+        self._check_queries()
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    def test_evicts_least_recently_updated(self):
+        """Test that the number of series is bounded."""
+        store = TimeSeriesStore(capacity=4, max_series=2)
+        store.append("credits", 1, labels={"vote_account": "a"})
+        store.append("credits", 1, labels={"vote_account": "b"})
+        store.append("credits", 2, labels={"vote_account": "a"})
+        store.append("credits", 1, labels={"vote_account": "c"})
+        self.assertIsNone(store.get("credits", {"vote_account": "b"}))
+        self.assertEqual(store.get("credits", {"vote_account": "a"}).last(), 2)
+
+    def test_publish(self):
+        """Test that derived values are set on the labelled gauge."""
+        registry = CollectorRegistry()
+        gauge = Gauge("credit_rate", "rate", ["vote_account"], registry=registry)
+        store = TimeSeriesStore(capacity=4)
+        for t in range(3):
+            store.append("credits", 10 * t, labels={"vote_account": "a"}, timestamp=t)
+        store.append("credits", 5, labels={"vote_account": "b"}, timestamp=0)
+        store.append("slot", 1, timestamp=0)
+
+        self.assertEqual(store.publish(gauge, "credits", lambda b: b.rate()), 1)
+        self.assertEqual(registry.get_sample_value("credit_rate", {"vote_account": "a"}), 10)
+        self.assertIsNone(registry.get_sample_value("credit_rate", {"vote_account": "b"}))
+
+        store.discard("credits", {"vote_account": "a"})
+        self.assertEqual(
+            [labels for labels, _ in store.series("credits")], [{"vote_account": "b"}]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
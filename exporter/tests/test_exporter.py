@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+from prometheus_client import Gauge, generate_latest
+
 from exporter.jsonRPCRequest import JsonRPCRequest
 from exporter.jsonRPCResponse import JsonRPCResponse
 from exporter.rpcExporter import RPCExporter
@@ -29,6 +33,26 @@ class TestRPCExporter(unittest.TestCase):
         response = exporter._rpc_call(JsonRPCRequest("getSlot"))
         self.assertEqual(response[0].result, 42)
 
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {
+                "RPC_URL": "http://localhost:8899",
+                "PUBLIC_RPC_URL": "https://api.testnet.solana.com",
+                "EXPORTER_PORT": "7896",
+                "POLL_INTERVAL": "10",
+                "SNAPSHOT_FILE": os.path.join(tmpdir, "state.snap"),
+            }
+            keys = {key.lower(): key for key in env}
+            with patch.dict("os.environ", env):
+                exporter = RPCExporter(config_source="fromEnv", config_keys=keys)
+                Gauge("slot", "Current slot", registry=exporter.registry).set(7)
+                self.assertTrue(exporter.save_snapshot())
+
+                restarted = RPCExporter(config_source="fromEnv", config_keys=keys)
+                warm_start = restarted._restore_snapshot()
+
+            self.assertIn(b"slot 7.0", generate_latest(warm_start))
+
 
 class TestJsonRPCResponse(unittest.TestCase):
     def test_is_successful(self):
@@ -127,6 +151,13 @@ class TestExporterConfig(unittest.TestCase):
             self.assertEqual(config.exporter_port, "7896")
             self.assertEqual(config.poll_interval, "10")
 
+    def test_get_optional(self):
+        config = ExporterConfig.init({"rpc_url": "SOLANA_RPC_URL"})
+        config._config["rpc_url"] = "http://localhost:8899"
+        self.assertEqual(config.get("rpc_url"), "http://localhost:8899")
+        self.assertIsNone(config.get("max_batch_size"))
+        self.assertEqual(config.get("max_batch_size", "100"), "100")
+
     def test_validate(self):
         config = ExporterConfig.init(
             {